@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+
+import argparse
+import concurrent.futures
+import hashlib
+import importlib.util
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+STATE_FILE = pathlib.Path('./out/.build-state.json')
+EDITIONS = ('oss', 'enterprise')
+# languages with a client target, also the matrix of bin/generate_clients.py
+LANGUAGES = ('python', 'ruby', 'java', 'csharp-netcore', 'markdown')
+
+# A build step. Its inputs are the files matched by the sources globs, read
+# once its deps are built, and it is rebuilt when their contents change or an
+# output is missing. Generated inputs make the check cut off early: a change
+# to an enterprise only object does not rebuild the OSS clients.
+Target = namedtuple('Target', 'name, deps, sources, outputs, command')
+
+def python_command(script, *args):
+    """Runs a python build script directly when PyYAML is installed locally,
+    and in the python image the bin/ wrappers use otherwise"""
+    if importlib.util.find_spec('yaml') is not None:
+        return [sys.executable, script, *args]
+    return ['docker', 'run', '--rm', '-v', f'{os.getcwd()}:/code', '-w', '/code',
+            'python:3.9', '/bin/bash', '-c',
+            f"pip install pyyaml && ./{script} {' '.join(args)}"]
+
+def build_graph():
+    """Describes every target, from the spec sources through the transformed
+    specs and the bundles to the clients, Kong config and Postman collection"""
+    targets = [
+        Target('transform', [], ['spec/*.yml', 'bin/transform.py'],
+               [f'out/{edition}/spec' for edition in EDITIONS],
+               python_command('bin/transform.py', '--oss', '--enterprise')),
+        Target('bundle-oss', ['transform'], ['out/oss/spec/*.yml', 'bin/bundle_spec.py'],
+               ['spec.yml'],
+               python_command('bin/bundle_spec.py', 'out/oss/spec/openapi.yml',
+                              '--outfile', 'spec.yml')),
+        Target('bundle-enterprise', ['transform'],
+               ['out/enterprise/spec/*.yml', 'bin/bundle_spec.py'],
+               ['out/enterprise/spec.yml'],
+               python_command('bin/bundle_spec.py', 'out/enterprise/spec/openapi.yml',
+                              '--outfile', 'out/enterprise/spec.yml')),
+        Target('lint', ['bundle-enterprise'],
+               ['out/enterprise/spec.yml', '.spectral.yml', 'bin/lint_spec'], [],
+               ['./bin/lint_spec', 'out/enterprise/spec.yml']),
+        Target('kong', ['bundle-oss'],
+               ['spec.yml', 'examples/kong/util.py', 'bin/generate_kong_config'],
+               ['out/kong/kong.yml'],
+               ['./bin/generate_kong_config', '--skip-bundle']),
+        Target('postman', ['bundle-oss'],
+               ['spec.yml', 'examples/postman/*.py', 'bin/generate_postman_collection'],
+               ['out/postman/collection.json'],
+               ['./bin/generate_postman_collection', '--skip-bundle']),
+    ]
+    for edition in EDITIONS:
+        for language in LANGUAGES:
+            targets.append(Target(
+                f'client-{edition}-{language}', ['transform'],
+                [f'out/{edition}/spec/*.yml', f'spec/config/{language}.yml',
+                 f'templates/{language}/**/*', 'bin/generate_client'],
+                [f'out/{edition}/{language}'],
+                ['./bin/generate_client', '-l', language, '--skip-transform']
+                + (['--enterprise'] if edition == 'enterprise' else [])
+            ))
+    return {target.name: target for target in targets}
+
+def digest_sources(target):
+    """Hashes the names and contents of a target's input files"""
+    digest = hashlib.sha256(json.dumps(target.command).encode())
+    for pattern in target.sources:
+        for path in sorted(pathlib.Path('.').glob(pattern)):
+            if path.is_file():
+                digest.update(str(path).encode() + b'\0')
+                digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+def is_stale(target, state):
+    if any(not pathlib.Path(output).exists() for output in target.outputs):
+        return True
+    return state.get(target.name) != digest_sources(target)
+
+def load_state():
+    """Reads the input digests of the targets built by earlier runs"""
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+
+def save_state(state):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    temporary = STATE_FILE.with_suffix('.tmp')
+    temporary.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    temporary.replace(STATE_FILE)
+
+def select(graph, names):
+    """Returns the named targets and everything they depend on, in dependency order"""
+    selected = []
+    def visit(name, chain=()):
+        if name in chain:
+            raise SystemExit(f"Dependency cycle: {' -> '.join(chain + (name,))}")
+        if name in selected:
+            return
+        for dep in graph[name].deps:
+            visit(dep, chain + (name,))
+        selected.append(name)
+    for name in names:
+        visit(name)
+    return selected
+
+def run(target):
+    """Runs one target, returning its exit status and combined output so the
+    output of parallel targets is not interleaved"""
+    start = time.monotonic()
+    result = subprocess.run(target.command, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, check=False)
+    return result.returncode, result.stdout, time.monotonic() - start
+
+def build(graph, names, state, jobs, dry_run=False):
+    """Builds the stale targets among names, running a target as soon as its
+    deps are built. Returns the targets that failed"""
+    order = select(graph, names)
+    pending = set(order)
+    rebuilt = set()
+    failed = []
+    running = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for name in [name for name in order if name in pending]:
+                target = graph[name]
+                if any(dep in failed or dep in pending for dep in target.deps):
+                    if any(dep in failed for dep in target.deps):
+                        pending.discard(name)
+                        failed.append(name)
+                        print(f'[{name}] skipped, a dependency failed')
+                    continue
+                if any(dep in running.values() for dep in target.deps):
+                    continue
+                pending.discard(name)
+                # inputs are only known once the deps have been built, a dry
+                # run assumes rebuilt deps change them
+                if not (dry_run and rebuilt.intersection(target.deps)) \
+                        and not is_stale(target, state):
+                    continue
+                rebuilt.add(name)
+                print(f'[{name}] {"stale" if dry_run else "building"}')
+                if dry_run:
+                    continue
+                running[executor.submit(run, target)] = name
+
+            if not running:
+                continue
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                status, output, elapsed = future.result()
+                if output:
+                    print(''.join(f'[{name}] {line}\n' for line in output.splitlines()), end='')
+                if status == 0:
+                    state[name] = digest_sources(graph[name])
+                    print(f'[{name}] built in {elapsed:.1f}s')
+                else:
+                    failed.append(name)
+                    state.pop(name, None)
+                    print(f'[{name}] failed with exit status {status}')
+    return failed
+
+def parse_args(argv, graph):
+    parser = argparse.ArgumentParser(
+        description="Builds the transformed specs, bundles, clients, Kong config and "
+                    "Postman collection, rebuilding only the targets whose inputs changed"
+    )
+    parser.add_argument('targets', nargs='*',
+                        help="targets to build along with their dependencies (default: all)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="targets to run at once (default: number of cores)")
+    parser.add_argument('-n', '--dry-run', action='store_true',
+                        help="list the stale targets without building them")
+    parser.add_argument('-f', '--force', action='store_true',
+                        help="rebuild the targets even if they are up to date")
+    parser.add_argument('-l', '--list', action='store_true', help="list the targets")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.targets if name not in graph]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+    return args
+
+def main(argv=None):
+    graph = build_graph()
+    args = parse_args(argv, graph)
+    if args.list:
+        for target in graph.values():
+            deps = f" (after {', '.join(target.deps)})" if target.deps else ''
+            print(f'{target.name}{deps}')
+        return 0
+
+    names = args.targets or list(graph)
+    state = load_state()
+    if args.force:
+        for name in select(graph, names):
+            state.pop(name, None)
+    try:
+        failed = build(graph, names, state, max(args.jobs, 1), args.dry_run)
+    finally:
+        if not args.dry_run:
+            save_state(state)
+
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+
+import argparse
+import pathlib
+import sys
+from collections import namedtuple
+from urllib.parse import quote, unquote
+
+import yaml
+
+# The libyaml bindings parse and emit several times faster than the pure python
+# implementation, fall back to it when PyYAML was built without libyaml
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+BaseDumper = getattr(yaml, 'CDumper', yaml.Dumper)
+
+class Dumper(BaseDumper):
+    """Writes objects shared between several refs out in full every time,
+    instead of as YAML anchors and aliases"""
+    def ignore_aliases(self, data):
+        return True
+
+class BundleError(Exception):
+    """Raised for refs that cannot be resolved"""
+
+# Where a ref ends up after following every ref along its pointer
+Target = namedtuple('Target', 'file, hash, value, indirections')
+
+# One $ref found while crawling the root document, as in swagger-cli's inventory
+Entry = namedtuple(
+    'Entry',
+    'ref, parent, key, path_from_root, depth, file, hash, value, extended, '
+    'external, indirections'
+)
+
+def is_ref(obj):
+    return isinstance(obj, dict) and isinstance(obj.get('$ref'), str)
+
+def escape(token):
+    """Encodes one JSON pointer token the way swagger-cli does: pointer escapes
+    first, then URI encoding"""
+    token = str(token).replace('~', '~0').replace('/', '~1')
+    return quote(token, safe="-_.!~*'()")
+
+def unescape(token):
+    return unquote(token).replace('~1', '/').replace('~0', '~')
+
+def to_hash(tokens):
+    return '#' + ''.join('/' + escape(token) for token in tokens)
+
+def parse_hash(hash_):
+    if hash_ in ('', '#', '#/'):
+        return []
+    if not hash_.startswith('#/'):
+        raise BundleError(f'Invalid JSON pointer: {hash_}')
+    return [unescape(token) for token in hash_[2:].split('/')]
+
+class Bundler:
+    """Bundles a spec split over several files into one document.
+
+    The algorithm is the one swagger-cli bundle uses: every $ref reachable from
+    the root file is inventoried once, then the first occurrence of each
+    external target is inlined and every other ref to it is pointed at that
+    occurrence. Refs that reach their own ancestors are left as internal refs,
+    so cyclic schemas bundle without being expanded forever.
+    """
+    def __init__(self, root_file):
+        self.root = pathlib.Path(root_file).resolve()
+        self.documents = {}
+        self.targets = {}
+        self.inventory = []
+        self.entries = {}
+
+    def load(self, file):
+        """Parses each file once"""
+        if file not in self.documents:
+            try:
+                text = file.read_text(encoding='utf-8')
+            except OSError as e:
+                raise BundleError(f'Cannot read {file}: {e.strerror}') from e
+            self.documents[file] = yaml.load(text, Loader=Loader)
+        return self.documents[file]
+
+    def locate(self, file, ref):
+        """Splits a ref into the file it points into and its hash"""
+        path, _, hash_ = ref.partition('#')
+        if path:
+            file = (file.parent / unquote(path)).resolve()
+        return file, '#' + hash_
+
+    def resolve(self, file, hash_, resolving=()):
+        """Follows a pointer, and every ref met along it, to its value.
+        Results are memoised, a spec refers to the same schemas many times"""
+        key = (file, hash_)
+        if key in self.targets:
+            return self.targets[key]
+        if key in resolving:
+            chain = ' -> '.join(f'{f.name}{h}' for f, h in resolving + (key,))
+            raise BundleError(f'Circular $ref with no value: {chain}')
+        resolving += (key,)
+
+        value = self.load(file)
+        tokens = []
+        indirections = 0
+        for token in parse_hash(hash_) + [None]:
+            if is_ref(value):
+                ref_file, ref_hash = self.locate(file, value['$ref'])
+                if (ref_file, ref_hash) == (file, to_hash(tokens)):
+                    raise BundleError(f'$ref refers to itself: {file.name}{ref_hash}')
+                target = self.resolve(ref_file, ref_hash, resolving)
+                if len(value) > 1:
+                    # extended refs keep their own keys next to the target's
+                    value = {**target.value, **value}
+                    del value['$ref']
+                else:
+                    value = target.value
+                file, tokens = target.file, parse_hash(target.hash)
+                indirections += target.indirections + 1
+            if token is None:
+                break
+            if isinstance(value, list) and token.isdigit() and int(token) < len(value):
+                value = value[int(token)]
+            elif isinstance(value, dict) and token in value:
+                value = value[token]
+            else:
+                raise BundleError(f'Cannot resolve {to_hash(tokens + [token])} in {file}')
+            tokens.append(token)
+
+        target = Target(file, to_hash(tokens), value, indirections)
+        self.targets[key] = target
+        return target
+
+    def crawl(self, obj, file, path_from_root, indirections):
+        """Inventories the refs below obj. Definitions are crawled first so they
+        win over other occurrences of the same schema"""
+        keys = range(len(obj)) if isinstance(obj, list) else sorted(
+            obj, key=lambda key: key != 'definitions')
+        for key in keys:
+            value = obj[key]
+            if is_ref(value):
+                self.inventory_ref(obj, key, file, path_from_root + [key], indirections)
+            elif isinstance(value, (dict, list)):
+                self.crawl(value, file, path_from_root + [key], indirections)
+
+    def inventory_ref(self, parent, key, file, path_from_root, indirections):
+        ref = parent[key]
+        target = self.resolve(*self.locate(file, ref['$ref']))
+        depth = len(path_from_root)
+        indirections += target.indirections
+
+        existing = self.entries.get((id(parent), key))
+        if existing:
+            # the same ref object is reachable from several places, keep the
+            # shallowest occurrence
+            if depth >= existing.depth and indirections >= existing.indirections:
+                return
+            self.inventory.remove(existing)
+
+        entry = Entry(ref, parent, key, path_from_root, depth, target.file, target.hash,
+                      target.value, len(ref) > 1, target.file != self.root, indirections)
+        self.inventory.append(entry)
+        self.entries[(id(parent), key)] = entry
+
+        if not existing and isinstance(target.value, (dict, list)):
+            self.crawl(target.value, target.file, path_from_root, indirections + 1)
+
+    def remap(self):
+        """Rewrites the inventoried refs in place. The first occurrence of each
+        target is inlined, the others point at it"""
+        def order(entry):
+            definitions = to_hash(entry.path_from_root).rfind('/definitions')
+            return (str(entry.file), entry.hash, entry.extended,
+                    entry.indirections, entry.depth, -definitions,
+                    len(to_hash(entry.path_from_root)))
+
+        anchor_file = anchor_hash = anchor_path = None
+        for entry in sorted(self.inventory, key=order):
+            path_from_root = to_hash(entry.path_from_root)
+            if not entry.external:
+                entry.ref['$ref'] = entry.hash
+            elif entry.file == anchor_file and entry.hash == anchor_hash:
+                entry.ref['$ref'] = anchor_path
+            elif entry.file == anchor_file and entry.hash.startswith(anchor_hash + '/'):
+                entry.ref['$ref'] = anchor_path + entry.hash[len(anchor_hash):]
+            else:
+                anchor_file, anchor_hash, anchor_path = entry.file, entry.hash, path_from_root
+                if entry.extended:
+                    value = {**entry.value, **entry.ref}
+                    del value['$ref']
+                else:
+                    value = entry.value
+                entry.parent[entry.key] = value
+
+    def bundle(self):
+        root = self.load(self.root)
+        if isinstance(root, (dict, list)):
+            self.crawl(root, self.root, [], 0)
+        self.remap()
+        return root
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Bundles a spec split over several files into a single file, "
+                    "resolving the refs between them"
+    )
+    parser.add_argument('input_file', type=pathlib.Path,
+                        help="root spec file, e.g. out/oss/spec/openapi.yml")
+    parser.add_argument('-o', '--outfile', type=pathlib.Path, default=pathlib.Path('spec.yml'),
+                        help="bundled file to write (default: spec.yml)")
+    args = parser.parse_args(argv)
+
+    try:
+        bundled = Bundler(args.input_file).bundle()
+    except (BundleError, yaml.YAMLError) as e:
+        print(e)
+        return 1
+
+    args.outfile.write_text(
+        yaml.dump(bundled, Dumper=Dumper, sort_keys=False, allow_unicode=True),
+        encoding='utf-8'
+    )
+    print(f'Created {args.outfile} from {args.input_file}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+// Generates every client of a matrix in one generator JVM, run by bin/generate_clients.py as
+//   jjs -cp openapi-generator-cli.jar bin/generate_clients.js -- <jobs> <targets json>
+// Each target is an object with the edition, language, input spec, output directory and the
+// configuration file and template directory to use, if any. A line
+//   RESULT <edition> <language> <ok|failed> <seconds> [error]
+// is printed, tab separated, when each client is done.
+//
+// Each input spec is parsed once, as CodegenConfigurator would parse it. Generators change the
+// document they are given, so every client is given a copy of it, read back from its JSON.
+
+var CodegenConfigurator = Java.type('org.openapitools.codegen.config.CodegenConfigurator');
+var DefaultGenerator = Java.type('org.openapitools.codegen.DefaultGenerator');
+var OpenAPIParser = Java.type('io.swagger.parser.OpenAPIParser');
+var ParseOptions = Java.type('io.swagger.v3.parser.core.models.ParseOptions');
+var OpenAPI = Java.type('io.swagger.v3.oas.models.OpenAPI');
+var Json = Java.type('io.swagger.v3.core.util.Json');
+var Files = Java.type('java.nio.file.Files');
+var StandardCharsets = Java.type('java.nio.charset.StandardCharsets');
+var Callable = Java.type('java.util.concurrent.Callable');
+var Executors = Java.type('java.util.concurrent.Executors');
+var TimeUnit = Java.type('java.util.concurrent.TimeUnit');
+var System = Java.type('java.lang.System');
+
+var jobs = parseInt(arguments[0], 10);
+var targets = JSON.parse(arguments[1]);
+
+// CodegenConfigurator parses the input spec while configuring the generator. It is pointed at
+// this empty spec instead, and the generator is then given the parsed spec of its target.
+var EMPTY_SPEC = Files.createTempFile('empty-spec', '.json');
+EMPTY_SPEC.toFile().deleteOnExit();
+Files.write(EMPTY_SPEC, new java.lang.String(
+    '{"openapi": "3.0.0", "info": {"title": "", "version": ""}, "paths": {}}'
+).getBytes(StandardCharsets.UTF_8));
+
+// the JSON of each input spec, or the error it failed to parse with
+function parseSpecs() {
+    var specs = {};
+    var options = new ParseOptions();
+    options.setResolve(true);
+    targets.forEach(function(target) {
+        if (specs.hasOwnProperty(target.input)) {
+            return;
+        }
+        try {
+            var result = new OpenAPIParser().readLocation(target.input, null, options);
+            if (result.getOpenAPI() === null) {
+                throw String(result.getMessages());
+            }
+            specs[target.input] = {json: Json.mapper().writeValueAsString(result.getOpenAPI())};
+        } catch (e) {
+            specs[target.input] = {error: e};
+        }
+    });
+    return specs;
+}
+
+var specs = parseSpecs();
+
+function generate(target) {
+    var start = System.nanoTime();
+    var error = null;
+    try {
+        var spec = specs[target.input];
+        if (spec.error !== undefined) {
+            throw spec.error;
+        }
+        var configurator = target.config ?
+            CodegenConfigurator.fromFile(target.config) : new CodegenConfigurator();
+        configurator.setGeneratorName(target.language);
+        configurator.setInputSpec(EMPTY_SPEC.toString());
+        configurator.setOutputDir(target.output);
+        if (target.templates) {
+            configurator.setTemplateDir(target.templates);
+        }
+        var input = configurator.toClientOptInput();
+        input.getConfig().setInputSpec(target.input);
+        input.openAPI(Json.mapper().readValue(spec.json, OpenAPI.class));
+        new DefaultGenerator().opts(input).generate();
+    } catch (e) {
+        error = String(e).replace(/\s+/g, ' ');
+    }
+    var seconds = (System.nanoTime() - start) / 1e9;
+    var fields = ['RESULT', target.edition, target.language, error === null ? 'ok' : 'failed',
+                  seconds.toFixed(1)];
+    if (error !== null) {
+        fields.push(error);
+    }
+    System.out.println(fields.join('\t'));
+    return error === null;
+}
+
+var executor = Executors.newFixedThreadPool(Math.max(jobs, 1));
+var futures = targets.map(function(target) {
+    return executor.submit(new Callable(function() { return generate(target); }));
+});
+executor.shutdown();
+executor.awaitTermination(1, TimeUnit.DAYS);
+
+var failed = futures.filter(function(future) { return !future.get(); }).length;
+System.exit(failed === 0 ? 0 : 1);
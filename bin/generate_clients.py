@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import time
+
+from build import EDITIONS, LANGUAGES, python_command
+
+# Kept in step with bin/generate_client
+GENERATOR_IMAGE = 'openapitools/openapi-generator-cli:v4.3.1'
+
+# The generator's jar in its image, run with the JRE's Nashorn engine by
+# bin/generate_clients.js so that every client is generated in one JVM
+GENERATOR_JAR = '/opt/openapi-generator/modules/openapi-generator-cli/target/openapi-generator-cli.jar'
+
+def generate_target(edition, language):
+    """What bin/generate_clients.js needs to generate one client, using the
+    language's templates and configuration file when the repository has them"""
+    target = {
+        'edition': edition,
+        'language': language,
+        'input': f'/local/out/{edition}/spec/openapi.yml',
+        'output': f'/local/out/{edition}/{language}',
+    }
+    if pathlib.Path(f'spec/config/{language}.yml').exists():
+        target['config'] = f'/local/spec/config/{language}.yml'
+    if pathlib.Path(f'templates/{language}').exists():
+        target['templates'] = f'/local/templates/{language}'
+    return target
+
+def generate(targets, jobs, done):
+    """Replaces the clients of every target from a single generator JVM,
+    calling done with each client's edition, language, exit status and wall
+    time as it is generated. Returns the generator's log"""
+    for edition, language in targets:
+        shutil.rmtree(f'out/{edition}/{language}', ignore_errors=True)
+    subprocess.run(['docker', 'pull', '-q', GENERATOR_IMAGE], check=True,
+                   stdout=subprocess.DEVNULL)
+    command = [
+        'docker', 'run', '--rm', '-v', f'{os.getcwd()}:/local', '--entrypoint', 'jjs',
+        GENERATOR_IMAGE, '-cp', GENERATOR_JAR, '/local/bin/generate_clients.js', '--',
+        str(jobs), json.dumps([generate_target(*target) for target in targets]),
+    ]
+    log = []
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True) as process:
+        for line in process.stdout:
+            if line.startswith('RESULT\t'):
+                _, edition, language, status, elapsed, *error = line.rstrip('\n').split('\t')
+                log.extend(error)
+                done(edition, language, 0 if status == 'ok' else 1, float(elapsed))
+            else:
+                log.append(line.rstrip('\n'))
+    return log
+
+def parse_args(argv):
+    def matrix(choices):
+        def parse(value):
+            values = [item.strip() for item in value.split(',') if item.strip()]
+            unknown = [item for item in values if item not in choices]
+            if unknown:
+                raise argparse.ArgumentTypeError(
+                    f"unknown {', '.join(unknown)}, choose from {', '.join(choices)}")
+            return values
+        return parse
+
+    parser = argparse.ArgumentParser(
+        description="Generates clients for every given language and edition concurrently "
+                    "in one generator JVM. Clients are output to ./out/<edition>/<language>"
+    )
+    parser.add_argument('-l', '--languages', type=matrix(LANGUAGES), default=list(LANGUAGES),
+                        help=f"comma separated languages (default: {','.join(LANGUAGES)})")
+    parser.add_argument('-e', '--editions', type=matrix(EDITIONS), default=['oss'],
+                        help="comma separated editions, oss and/or enterprise (default: oss)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="clients to generate at once (default: number of cores)")
+    parser.add_argument('-s', '--skip-transform', action='store_true',
+                        help="use the transformed specs already in ./out/<edition>/spec")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    targets = [(edition, language) for edition in args.editions for language in args.languages]
+
+    start = time.monotonic()
+    if not args.skip_transform:
+        subprocess.run(python_command('bin/transform.py',
+                                      *(f'--{edition}' for edition in args.editions)),
+                       check=True)
+
+    results = {}
+
+    def done(edition, language, status, elapsed):
+        results[(edition, language)] = (status, elapsed)
+        print(f"{'Generated' if status == 0 else 'Failed to generate'} "
+              f"out/{edition}/{language} in {elapsed:.1f}s", flush=True)
+
+    log = generate(targets, max(args.jobs, 1), done)
+    # a client without a result was lost with the generator
+    for target in targets:
+        results.setdefault(target, (1, 0.0))
+    if any(status != 0 for status, _ in results.values()):
+        print('\n'.join(log))
+
+    print()
+    print(f"{'edition':<12}{'language':<16}{'status':<8}{'seconds':>8}")
+    for edition, language in targets:
+        status, elapsed = results[(edition, language)]
+        print(f"{edition:<12}{language:<16}{'ok' if status == 0 else 'failed':<8}{elapsed:>8.1f}")
+    print(f"{len(targets)} clients in {time.monotonic() - start:.1f}s")
+
+    return 1 if any(status != 0 for status, _ in results.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,32 @@
 #!/usr/bin/env python
 
-import sys
+import argparse
+import hashlib
+import json
 import pathlib
-import os
+import sys
 
 import yaml
 
-class Annotation:
-    """Defines an object annotation in the spec
+# The libyaml bindings parse and emit several times faster than the pure python
+# implementation, fall back to it when PyYAML was built without libyaml
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+Dumper = getattr(yaml, 'CDumper', yaml.Dumper)
+
+SPEC_DIR = pathlib.Path('./spec')
+OUTPUT_DIRS = {
+    'enterprise': pathlib.Path('./out/enterprise/spec'),
+    'oss': pathlib.Path('./out/oss/spec'),
+}
+CACHE_FILE = pathlib.Path('./out/.transform-cache.json')
+
+# Outputs depend on this script as much as on their input
+SCRIPT_DIGEST = hashlib.sha256(pathlib.Path(__file__).read_bytes()).hexdigest()
+
+def is_enterprise_only(obj):
+    """Checks whether an object is annotated as enterprise only
 
-    Defined as all fields under x-conjur-settings.
+    Annotations are all fields under x-conjur-settings.
     e.g. to annotate the object Path:
 
     .. code-block:: yaml
@@ -18,92 +35,113 @@ class Annotation:
             x-conjur-settings:
                 enterprise-only: true
     """
-    def __init__(self, annotation: dict, obj_path: list):
-        annotation = annotation['x-conjur-settings']
-        self.annotation = annotation
-        self.obj_path = obj_path
-        if 'enterprise-only' in annotation and isinstance(annotation['enterprise-only'], bool):
-            self.dap_only = annotation['enterprise-only']
-        else:
-            self.dap_only = False
-
-def __find_annotations(obj, object_path=None):
-    """Helper function recurses through a yaml object and returns a list of all annotations"""
-    annotations = []
-    if not isinstance(obj, dict):
-        return annotations
-    for i in obj:
-        if i == 'x-conjur-settings':
-            annotations.append(Annotation({i: obj[i]}, object_path))
-        annotations += __find_annotations(obj[i], object_path + [i])
-    return annotations
-
-def find_annotations(obj):
-    """Finds all annotations in a given object"""
-    return __find_annotations(obj, [])
-
-def verify_object_exists(obj: dict, obj_path: list):
-    """Verifies that a given object has a given sub-object defined by obj_path"""
-    if not obj_path:
-        return True
-    if obj_path[0] in obj:
-        return verify_object_exists(obj[obj_path[0]], obj_path[1:])
-    return False
-
-def remove_object(obj, obj_path):
-    """Removes the sub-object defined by obj_path from obj"""
-    if len(obj_path) == 1:
-        del obj[obj_path[0]]
-    else:
-        remove_object(obj[obj_path[0]], obj_path[1:])
-        if obj[obj_path[0]] == {}:
-            del obj[obj_path[0]]
-
-def usage():
-    """Prints usage information and exits"""
-    print("Usage: transform <input-file> [--enterprise/--oss]")
-    sys.exit()
-
-def get_output_dir(generate_dap):
-    """Finds which directory to output to, this is dependant on whether we
-    are generating the enterprise or oss version of the spec"""
-    if generate_dap:
-        output_dir = pathlib.Path('./out/enterprise/spec')
-    else:
-        output_dir = pathlib.Path('./out/oss/spec')
-    if not output_dir.exists():
-        output_dir.mkdir()
-    return output_dir
+    settings = obj.get('x-conjur-settings')
+    return isinstance(settings, dict) and settings.get('enterprise-only') is True
+
+def remove_enterprise_only(obj):
+    """Removes enterprise only objects from obj in a single pass, along with the
+    objects left empty by their removal. Returns whether anything was removed"""
+    removed = False
+    for key in list(obj):
+        value = obj[key]
+        if not isinstance(value, dict):
+            continue
+        if is_enterprise_only(value):
+            del obj[key]
+            removed = True
+        elif remove_enterprise_only(value):
+            removed = True
+            if not value:
+                del obj[key]
+    return removed
+
+def load_cache(enabled):
+    """Reads the digests of the outputs written by earlier runs"""
+    if not enabled or not CACHE_FILE.exists():
+        return {}
+    try:
+        return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+
+def save_cache(cache):
+    """Writes the cache through a temporary file, so an interrupted run cannot
+    leave it truncated"""
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    temporary = CACHE_FILE.with_suffix('.tmp')
+    temporary.write_text(json.dumps(cache, indent=2, sort_keys=True), encoding="utf-8")
+    temporary.replace(CACHE_FILE)
+
+def transform(input_file, editions, cache):
+    """Writes the given editions of one spec file, skipping the outputs whose
+    input and script are unchanged since they were written. Returns the
+    editions written"""
+    source = input_file.read_bytes()
+    pending = {}
+    for edition in editions:
+        output = OUTPUT_DIRS[edition] / input_file.name
+        digest = hashlib.sha256(
+            f'{SCRIPT_DIGEST}:{edition}:'.encode() + source
+        ).hexdigest()
+        if not output.exists() or cache.get(str(output)) != digest:
+            pending[edition] = (output, digest)
+    if not pending:
+        return []
+
+    data = yaml.load(source, Loader=Loader)
+    # enterprise is written first, the oss edition is then stripped in place
+    for edition in ('enterprise', 'oss'):
+        if edition not in pending:
+            continue
+        if edition == 'oss' and isinstance(data, dict):
+            remove_enterprise_only(data)
+        output, digest = pending[edition]
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(yaml.dump(data, Dumper=Dumper), encoding="utf-8")
+        cache[str(output)] = digest
+    return list(pending)
+
+def parse_args(argv):
+    """Parses the command line, defaulting to every file in the spec directory"""
+    parser = argparse.ArgumentParser(
+        description="Writes the OSS and Enterprise editions of the spec files to "
+                    "out/<edition>/spec, removing enterprise only objects from the OSS edition"
+    )
+    parser.add_argument('files', nargs='*', type=pathlib.Path,
+                        help="spec files to transform (default: every file in spec/)")
+    parser.add_argument('--oss', action='store_true', help="write the OSS edition")
+    parser.add_argument('--enterprise', action='store_true',
+                        help="write the Enterprise edition")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="transform every file, even when it is unchanged")
+    args = parser.parse_args(argv)
+    if not (args.oss or args.enterprise):
+        parser.error("specify --oss, --enterprise or both")
+    if not args.files:
+        args.files = sorted(path for path in SPEC_DIR.iterdir() if path.is_file())
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    editions = [edition for edition in ('oss', 'enterprise') if getattr(args, edition)]
+    cache = load_cache(not args.no_cache)
+
+    skipped = 0
+    try:
+        for input_file in args.files:
+            written = transform(input_file, editions, cache)
+            skipped += len(editions) - len(written)
+            for edition in written:
+                print(input_file, f'--{edition}')
+    except yaml.YAMLError as e:
+        print(e)
+        return 1
+    finally:
+        save_cache(cache)
+
+    if skipped:
+        print(f'{skipped} outputs up to date')
+    return 0
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        usage()
-
-    input_file = pathlib.Path(sys.argv[1])
-    if '--enterprise' in sys.argv:
-        generate_dap = True
-    elif '--oss' in sys.argv:
-        generate_dap = False
-    else:
-        usage()
-
-    # read in the input object we are parsing
-    with input_file.open(encoding="utf-8") as f:
-        try:
-            data = yaml.safe_load(f)
-        except yaml.YAMLError as e:
-            print(e)
-            sys.exit(1)
-
-    # retrieve a list of annotations in the object we are parsing
-    annotations = find_annotations(data)
-
-    # For each found annotation check if we need to remove it then do so
-    for i in annotations:
-        if i.dap_only and not generate_dap and verify_object_exists(data, i.obj_path):
-            remove_object(data, i.obj_path)
-
-    # write the output file
-    output_dir = get_output_dir(generate_dap)
-    with (output_dir / os.path.basename(input_file.name)).open(mode="w", encoding="utf-8") as f:
-        f.write(yaml.dump(data))
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Micro-benchmarks of the generated Python client against a local stub server.
+
+Each scenario calls one API operation with 1, 8 and 64 threads sharing a client,
+or decodes a canned response body without making a request, and reports the throughput, p50 and p99 latencies, the memory allocated during a
+call, and the process RSS. Results are written as JSON, which a later run can be
+compared with. No network access is needed: the stub server is started on the
+loopback interface unless --url is given.
+
+python test/benchmark/benchmark.py [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+import conjur
+from stub_server import RESOURCES, ROLE_GRAPH
+
+ACCOUNT = 'dev'
+LOGIN = 'admin'
+API_KEY = 'stub-api-key'
+VARIABLE_IDS = ','.join('{0}:variable:benchmark/secret-{1}'.format(ACCOUNT, i)
+                        for i in range(20))
+POLICY = '- !variable benchmark/secret\n'
+SCENARIOS = ('getSecret', 'getSecrets', 'getAccessToken', 'showResourcesForKind', 'showRoleGraph',
+             'loadPolicy', 'decodeResources', 'decodeRoleGraph')
+STUB_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stub_server.py')
+
+
+class CannedResponse(object):
+    """Stands in for the response of a request in the decode scenarios"""
+    def __init__(self, data):
+        self.data = data
+
+    def getheader(self, name, default=None):
+        return 'application/json' if name.lower() == 'content-type' else default
+
+
+def scenarios(client):
+    """Returns the operations benchmarked, by name"""
+    authn = conjur.api.AuthenticationApi(client)
+    secrets = conjur.api.SecretsApi(client)
+    resources = conjur.api.ResourcesApi(client)
+    roles = conjur.api.RolesApi(client)
+    policies = conjur.api.PoliciesApi(client)
+    return {
+        'getSecret': lambda: secrets.get_secret(ACCOUNT, 'variable', 'benchmark/secret'),
+        'getSecrets': lambda: secrets.get_secrets(variable_ids=VARIABLE_IDS),
+        'getAccessToken': lambda: authn.get_access_token(
+            ACCOUNT, LOGIN, body=API_KEY, accept_encoding='base64'),
+        'showResourcesForKind': lambda: resources.show_resources_for_kind(
+            ACCOUNT, 'variable', limit=100),
+        'showRoleGraph': lambda: roles.show_role(ACCOUNT, 'user', 'admin', graph=''),
+        'loadPolicy': lambda: policies.load_policy(ACCOUNT, 'root', POLICY),
+        'decodeResources': lambda: [resource.to_dict() for resource in client.deserialize(
+            CannedResponse(RESOURCES), 'list[Resource]')],
+        'decodeRoleGraph': lambda: client.deserialize(CannedResponse(ROLE_GRAPH), 'object'),
+    }
+
+
+def make_client(url, concurrency, json_codec=None):
+    config = conjur.Configuration(host=url)
+    config.api_key = {'Authorization': 'Token token="stub-token"'}
+    config.connection_pool_maxsize = concurrency
+    config.json_codec = json_codec
+    return conjur.ApiClient(config)
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def rss_mib():
+    """Returns the current resident set size, or the peak where it is unknown"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2.0 ** 20
+    except (IOError, OSError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_threads(call, calls, concurrency):
+    """Makes `calls` calls from `concurrency` threads, returning the wall
+    time and every call's latency"""
+    remaining = [calls]
+    lock = threading.Lock()
+    latencies = []
+    start_barrier = threading.Barrier(concurrency + 1)
+
+    def worker():
+        timings = []
+        start_barrier.wait()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    break
+                remaining[0] -= 1
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(timings)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def allocations(call, calls):
+    """Returns the mean peak bytes allocated during a call, and the mean
+    number of memory blocks still allocated after one"""
+    gc.collect()
+    tracemalloc.start()
+    peaks = []
+    blocks = sys.getallocatedblocks()
+    for _ in range(calls):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    gc.collect()
+    return sum(peaks) / len(peaks), (sys.getallocatedblocks() - blocks) / float(calls)
+
+
+def benchmark(url, names, concurrencies, calls, warmup, alloc_calls, json_codec=None):
+    results = []
+    for concurrency in concurrencies:
+        client = make_client(url, concurrency, json_codec)
+        operations = scenarios(client)
+        for name in names:
+            call = operations[name]
+            run_threads(call, warmup, concurrency)
+            wall, latencies = run_threads(call, calls, concurrency)
+            latencies.sort()
+            alloc_bytes, retained_blocks = allocations(call, alloc_calls)
+            result = {
+                'scenario': name,
+                'concurrency': concurrency,
+                'calls': calls,
+                'throughput': calls / wall,
+                'p50_ms': percentile(latencies, 0.50) * 1e3,
+                'p99_ms': percentile(latencies, 0.99) * 1e3,
+                'alloc_bytes_per_call': alloc_bytes,
+                'retained_blocks_per_call': retained_blocks,
+                'rss_mib': rss_mib(),
+            }
+            results.append(result)
+            print('{scenario:<22}{concurrency:>4} threads {throughput:>9.0f}/s '
+                  'p50 {p50_ms:>7.3f}ms p99 {p99_ms:>7.3f}ms '
+                  'alloc {alloc_bytes_per_call:>8.0f}B rss {rss_mib:>6.1f}MiB'.format(**result),
+                  flush=True)
+        client.close()
+    return results
+
+
+def git_commit():
+    """The commit benchmarked. BENCHMARK_COMMIT is set by bin/benchmark, as the
+    image it runs in holds no .git directory"""
+    if os.environ.get('BENCHMARK_COMMIT'):
+        return os.environ['BENCHMARK_COMMIT']
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(STUB_SERVER),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Prints the change of each result from a baseline run"""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    before = {(r['scenario'], r['concurrency']): r for r in baseline['results']}
+    print('\nCompared with {0} ({1}):'.format(baseline_path, baseline['meta'].get('commit')))
+    for result in results:
+        old = before.get((result['scenario'], result['concurrency']))
+        if old is None:
+            continue
+        print('{0:<22}{1:>4} threads throughput {2:>+7.1f}% p99 {3:>+7.1f}% '
+              'alloc {4:>+7.1f}%'.format(
+                  result['scenario'], result['concurrency'],
+                  change(old['throughput'], result['throughput']),
+                  change(old['p99_ms'], result['p99_ms']),
+                  change(old['alloc_bytes_per_call'], result['alloc_bytes_per_call'])))
+
+
+def change(old, new):
+    return (new - old) * 100.0 / old if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='server to benchmark against, instead of the stub server')
+    parser.add_argument('--scenario', action='append', dest='scenarios',
+                        help='scenario to run, may be repeated. Defaults to all of them')
+    parser.add_argument('--concurrency', default='1,8,64',
+                        help='comma separated numbers of threads (default: %(default)s)')
+    parser.add_argument('--calls', type=int, default=2000,
+                        help='calls measured per scenario and concurrency (default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=200,
+                        help='calls made before measuring (default: %(default)s)')
+    parser.add_argument('--alloc-calls', type=int, default=100,
+                        help='calls traced to measure allocations (default: %(default)s)')
+    parser.add_argument('--json-codec', choices=('orjson', 'ujson', 'json'),
+                        help='JSON codec of the client (default: the fastest installed)')
+    parser.add_argument('--output', help='file the results are written to as JSON')
+    parser.add_argument('--compare', help='results file of an earlier run to compare with')
+    args = parser.parse_args()
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error('unknown scenarios: {0}'.format(', '.join(sorted(unknown))))
+    concurrencies = [int(c) for c in args.concurrency.split(',')]
+
+    server = None
+    url = args.url
+    if url is None:
+        server = subprocess.Popen([sys.executable, STUB_SERVER, '--port', '0'],
+                                  stdout=subprocess.PIPE)
+        url = server.stdout.readline().decode().strip()
+    try:
+        results = benchmark(url, names, concurrencies, args.calls, args.warmup,
+                            args.alloc_calls, args.json_codec)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'calls': args.calls,
+            'warmup': args.warmup,
+            'json_codec': conjur.JsonCodec.select(args.json_codec).name,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
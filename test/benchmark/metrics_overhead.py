@@ -0,0 +1,50 @@
+"""Measures the time ClientMetrics adds to an API call.
+
+Each sample begins and ends the measurements of a call, which is all the
+recording an ApiClient does for a call that sends no body. The best of several
+runs is reported, along with the cost of reading the clock and of an empty
+function call on the same machine for scale. With --limit-ns, exits with
+status 1 when the overhead is above the limit.
+
+python test/benchmark/metrics_overhead.py [--calls 20000] [--limit-ns 1000]
+"""
+import argparse
+import sys
+import time
+import timeit
+
+import conjur
+
+
+def best_ns(function, calls, repeat):
+    return min(timeit.repeat(function, number=calls, repeat=repeat)) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000,
+                        help='calls per run (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=50,
+                        help='runs, of which the fastest is reported (default: %(default)s)')
+    parser.add_argument('--limit-ns', type=float,
+                        help='most nanoseconds per call accepted')
+    args = parser.parse_args()
+
+    metrics = conjur.ClientMetrics()
+
+    def record():
+        metrics.begin('getSecret').end(200)
+
+    def empty():
+        pass
+
+    overhead = best_ns(record, args.calls, args.repeat)
+    clock = best_ns(time.perf_counter_ns, args.calls, args.repeat)
+    call = best_ns(empty, args.calls, args.repeat)
+    print('ClientMetrics overhead {0:.0f}ns per call (clock read {1:.0f}ns, '
+          'empty call {2:.0f}ns)'.format(overhead, clock, call))
+    return 1 if args.limit_ns is not None and overhead > args.limit_ns else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
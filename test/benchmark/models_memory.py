@@ -0,0 +1,66 @@
+"""Measures the memory held by the models of a large resource listing.
+
+A listing of resources shaped like those of the stub server is decoded into a
+list of Resource models, which is kept while the memory still allocated is
+traced with tracemalloc. The JSON body and its decoded form are released before
+the measurement, so only the models are counted. Run it against clients
+generated with and without the compactModels option to compare them.
+
+python test/benchmark/models_memory.py [--items 100000]
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+import conjur
+
+from benchmark import CannedResponse
+
+
+def listing(items):
+    return json.dumps([{
+        'created_at': '2021-03-23T16:37:14.455+00:00',
+        'id': 'dev:variable:benchmark/secret-{0}'.format(i),
+        'owner': 'dev:user:admin',
+        'policy': 'dev:policy:root',
+        'permissions': [{'privilege': 'read', 'role': 'dev:user:admin',
+                         'policy': 'dev:policy:root'}],
+        'annotations': [{'name': 'description', 'value': 'benchmark',
+                         'policy': 'dev:policy:root'}],
+        'secrets': [{'version': 1}],
+    } for i in range(items)]).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100000,
+                        help='resources in the listing (default: %(default)s)')
+    args = parser.parse_args()
+
+    client = conjur.ApiClient(conjur.Configuration(host='http://localhost'))
+    response = CannedResponse(listing(args.items))
+    compact = hasattr(conjur.models.Resource, '_from_openapi_data')
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    resources = client.deserialize(response, 'list[Resource]')
+    seconds = time.perf_counter() - start
+    response.data = None
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{0} {1} resources held {2:.1f}MiB ({3:.0f} bytes each), peak {4:.1f}MiB, '
+          'decoded in {5:.2f}s'.format(
+              args.items, 'compact' if compact else 'stock', held / 2 ** 20,
+              held / max(len(resources), 1), peak / 2 ** 20, seconds))
+    client.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""A local stand-in for Conjur replaying canned responses, for benchmarks.
+
+Unlike test/test-server.py it keeps connections alive, logs nothing and
+answers from prebuilt responses on a single asyncio loop, so the client
+under test is what the benchmark measures.
+
+python test/benchmark/stub_server.py [--port PORT]
+
+With --port 0 a free port is picked. The address is printed on the first
+line of output once the server accepts connections.
+"""
+import argparse
+import asyncio
+import json
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ACCESS_TOKEN = (b'eyJwcm90ZWN0ZWQiOiJleUpoYkdjaU9pSmpiMjVxZFhJdWIzSm5MM05zYjNOc'
+                b'FkyVnVjMlVpZlE9PSIsInBheWxvYWQiOiJleUp6ZFdJaU9pSmhaRzFwYmlKOSJ9')
+SECRET_VALUE = b'stub-secret-value'
+RESOURCE_COUNT = 100
+ROLE_GRAPH_EDGES = 500
+
+RESOURCES = json.dumps([{
+    'created_at': '2021-03-23T16:37:14.455+00:00',
+    'id': 'dev:variable:benchmark/secret-{0}'.format(i),
+    'owner': 'dev:user:admin',
+    'policy': 'dev:policy:root',
+    'permissions': [{'privilege': 'read', 'role': 'dev:user:admin', 'policy': 'dev:policy:root'}],
+    'annotations': [{'name': 'description', 'value': 'benchmark', 'policy': 'dev:policy:root'}],
+    'secrets': [{'version': 1}],
+} for i in range(RESOURCE_COUNT)]).encode()
+
+ROLE_GRAPH = json.dumps({
+    'graph': [{
+        'parent': 'dev:group:benchmark/group-{0}'.format(i // 10),
+        'child': 'dev:user:benchmark/user-{0}'.format(i),
+    } for i in range(ROLE_GRAPH_EDGES)],
+}).encode()
+
+LOADED_POLICY = json.dumps({
+    'created_roles': {
+        'dev:host:benchmark/app': {
+            'id': 'dev:host:benchmark/app',
+            'api_key': '309yzpa1n5kp932waxw6d37x4hew2x8ve8w11m8xn92acfy672m929en',
+        },
+    },
+    'version': 1,
+}).encode()
+
+
+def response(status, body=b'', content_type='application/json'):
+    """Builds the bytes of a complete HTTP/1.1 response"""
+    reason = {200: 'OK', 201: 'Created', 404: 'Not Found'}[status]
+    head = 'HTTP/1.1 {0} {1}\r\nContent-Type: {2}\r\nContent-Length: {3}\r\n\r\n'.format(
+        status, reason, content_type, len(body))
+    return head.encode() + body
+
+
+TOKEN_RESPONSE = response(200, ACCESS_TOKEN, 'text/plain')
+SECRET_RESPONSE = response(200, SECRET_VALUE, 'application/octet-stream')
+RESOURCES_RESPONSE = response(200, RESOURCES)
+ROLE_GRAPH_RESPONSE = response(200, ROLE_GRAPH)
+POLICY_RESPONSE = response(201, LOADED_POLICY)
+HEALTH_RESPONSE = response(200, b'{"ok": true}')
+NOT_FOUND = response(404, b'{"error": {"code": "not_found"}}')
+
+
+def route(method, target):
+    """Returns the response to a request"""
+    url = urlsplit(target)
+    path = url.path
+    if path.startswith('/authn/') and path.endswith('/authenticate') and method == 'POST':
+        return TOKEN_RESPONSE
+    if path == '/secrets' and method == 'GET':
+        ids = parse_qs(url.query).get('variable_ids', [''])[0]
+        values = {unquote(i): SECRET_VALUE.decode() for i in ids.split(',') if i}
+        return response(200, json.dumps(values).encode())
+    if path.startswith('/secrets/') and method == 'GET':
+        return SECRET_RESPONSE
+    if path.startswith('/resources/') and method == 'GET':
+        return RESOURCES_RESPONSE
+    if path.startswith('/roles/') and method == 'GET':
+        return ROLE_GRAPH_RESPONSE
+    if path.startswith('/policies/') and method in ('POST', 'PUT', 'PATCH'):
+        return POLICY_RESPONSE
+    if path == '/health':
+        return HEALTH_RESPONSE
+    return NOT_FOUND
+
+
+async def serve_connection(reader, writer):
+    try:
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, _ = lines[0].split(' ', 2)
+            length = 0
+            for line in lines[1:]:
+                if line[:15].lower() == 'content-length:':
+                    length = int(line[15:])
+            if length:
+                await reader.readexactly(length)
+            writer.write(route(method, target))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def main(port):
+    server = await asyncio.start_server(serve_connection, '127.0.0.1', port,
+                                        backlog=1024)
+    host, port = server.sockets[0].getsockname()[:2]
+    print('http://{0}:{1}'.format(host, port), flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080)
+    try:
+        asyncio.run(main(parser.parse_args().port))
+    except KeyboardInterrupt:
+        pass
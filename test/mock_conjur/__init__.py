@@ -0,0 +1,15 @@
+"""A stateful, in-process Conjur mock built from spec/openapi.yml.
+
+It stands in for the docker-compose stack when load testing clients:
+
+    with MockConjur(latency=0.002, error_rate=0.01) as conjur:
+        conjur.load_policy('- !variable db/password')
+        ...  # point a client at conjur.url, log in as admin/conjur.admin_api_key
+
+It is not a replacement for the integration tests against a real Conjur.
+Only the policy statements in policy.py are understood, and authenticators
+other than authn are answered from the examples in the spec.
+"""
+from .policy import PolicyError
+from .server import Fault, MockConjur
+from .state import ConjurError, ConjurState
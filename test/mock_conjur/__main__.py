@@ -0,0 +1,60 @@
+"""Runs the Conjur mock as a standalone server.
+
+python -m mock_conjur [--port PORT] [--policy FILE] [--latency SECONDS] ...
+
+Run from the test directory (or with it on PYTHONPATH). The url and the
+admin api key are printed once the server accepts connections.
+"""
+import argparse
+import sys
+
+from .server import MockConjur
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mock_conjur',
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='port to listen on, 0 picks a free one')
+    parser.add_argument('--account', default='dev')
+    parser.add_argument('--api-key', help='api key of the admin user (default: random)')
+    parser.add_argument('--policy', action='append', default=[],
+                        help='policy file loaded into root at startup, may be repeated')
+    parser.add_argument('--cert', help='certificate file, serves https when given')
+    parser.add_argument('--key', help='private key of --cert')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='random extra latency of up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='share of requests failed with --error-status')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--retry-after', type=int,
+                        help='Retry-After seconds sent with injected errors')
+    parser.add_argument('--rate-limit', type=float,
+                        help='requests per second allowed before answering 429')
+    parser.add_argument('--burst', type=int, help='requests allowed at once by --rate-limit')
+    parser.add_argument('--seed', type=int, help='seed for injected errors and jitter')
+    args = parser.parse_args(argv)
+
+    mock = MockConjur(account=args.account, admin_api_key=args.api_key, host=args.host,
+                      port=args.port, certfile=args.cert, keyfile=args.key, seed=args.seed,
+                      latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      error_status=args.error_status, retry_after=args.retry_after,
+                      rate_limit=args.rate_limit, burst=args.burst)
+    for policy_file in args.policy:
+        with open(policy_file, 'r', encoding='utf-8') as policy:
+            mock.load_policy(policy.read(), method='POST')
+    mock.start()
+    print(mock.url, flush=True)
+    print('admin api key: {0}'.format(mock.admin_api_key), flush=True)
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
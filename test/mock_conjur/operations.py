@@ -0,0 +1,342 @@
+"""Handlers for the spec operations the mock models, keyed by operationId.
+
+Each handler takes the ConjurState and a Request and returns a Response, or
+raises ConjurError for the error statuses Conjur would answer with.
+"""
+import base64
+import json
+from urllib.parse import parse_qs
+
+from .state import ConjurError, unauthorized, unprocessable
+
+OPERATIONS = {}
+
+
+class Request:
+    """A parsed request as seen by the operation handlers"""
+    def __init__(self, method, params, query, headers, body, client_address=None):
+        self.method = method
+        self.params = params
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.client_address = client_address
+
+    def arg(self, name, default=None):
+        """A query parameter, the first one if repeated"""
+        return self.query.get(name, [default])[0]
+
+    def flag(self, name):
+        """Conjur treats a present query flag as set unless it is `false`"""
+        return name in self.query and self.arg(name) != 'false'
+
+    def integer(self, name):
+        value = self.arg(name)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise unprocessable('{0} must be an integer'.format(name))
+
+    def form(self):
+        return parse_qs(self.body.decode('utf-8', 'replace'), keep_blank_values=True)
+
+    @property
+    def base64(self):
+        return 'base64' in self.headers.get('Accept-Encoding', '')
+
+    def basic_auth(self):
+        """The login and password of a Basic Authorization header"""
+        value = self.headers.get('Authorization', '')
+        if not value.startswith('Basic '):
+            raise unauthorized()
+        try:
+            login, _, password = base64.b64decode(value[6:]).decode().partition(':')
+        except ValueError:
+            raise unauthorized()
+        return login, password
+
+
+class Response:
+    def __init__(self, status, body=b'', content_type=None, headers=None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+def json_response(data, status=200):
+    return Response(status, json.dumps(data).encode(), 'application/json')
+
+
+def text_response(text, status=200, headers=None):
+    return Response(status, text.encode() if isinstance(text, str) else text,
+                    'text/plain', headers)
+
+
+def operation(operation_id):
+    def register(handler):
+        OPERATIONS[operation_id] = handler
+        return handler
+    return register
+
+
+def _role(state, request):
+    role_id, _ = state.token_role(request.headers.get('Authorization'))
+    return role_id
+
+
+def _account(state, request):
+    """Other accounts are never visible to the single account the mock holds"""
+    if request.params.get('account', state.account) != state.account:
+        raise ConjurError(404, 'not_found', 'Account {0} not found'.format(
+            request.params['account']))
+
+
+def _resource_id(state, request):
+    return state.full_id(request.params['kind'], request.params['identifier'])
+
+
+def _qualify(state, role):
+    """Expands `kind:id` role ids given in query parameters"""
+    return role if role.count(':') >= 2 else '{0}:{1}'.format(state.account, role)
+
+
+def _page(request, items):
+    offset = request.integer('offset') or 0
+    limit = request.integer('limit')
+    if request.flag('count'):
+        return json_response({'count': len(items)})
+    return json_response(items[offset:None if limit is None else offset + limit])
+
+
+# ---------- authentication ----------
+
+@operation('getAccessToken')
+def get_access_token(state, request):
+    role_id = state.authenticate(request.params['account'], request.params['login'],
+                                 request.body.decode('utf-8', 'replace').strip())
+    token = state.issue_token(role_id)
+    if request.base64:
+        return text_response(base64.b64encode(token.encode()),
+                             headers={'Content-Encoding': 'base64'})
+    return Response(200, token.encode(), 'application/json')
+
+
+@operation('getAPIKey')
+def get_api_key(state, request):
+    login, password = request.basic_auth()
+    role_id = state.authenticate(request.params['account'], login, password)
+    return text_response(state.resources[role_id].api_key)
+
+
+@operation('rotateApiKey')
+def rotate_api_key(state, request):
+    if request.headers.get('Authorization', '').startswith('Basic '):
+        login, password = request.basic_auth()
+        role_id = state.authenticate(request.params['account'], login, password)
+    else:
+        role_id = _role(state, request)
+    target = request.arg('role')
+    return text_response(state.rotate_api_key(role_id, target and _qualify(state, target)))
+
+
+@operation('changePassword')
+def change_password(state, request):
+    login, password = request.basic_auth()
+    role_id = state.authenticate(request.params['account'], login, password)
+    state.change_password(role_id, request.body.decode('utf-8', 'replace'))
+    return Response(204)
+
+
+# ---------- status ----------
+
+@operation('health')
+def health(state, request):
+    return json_response({'ok': True, 'database': {'ok': True}, 'services': {'ok': True}})
+
+
+@operation('whoAmI')
+def who_am_i(state, request):
+    role_id, claims = state.token_role(request.headers.get('Authorization'))
+    return json_response({
+        'client_ip': request.client_address,
+        'user_agent': request.headers.get('User-Agent'),
+        'account': state.account,
+        'username': claims['sub'],
+        'token_issued_at': claims.get('iat'),
+    })
+
+
+@operation('getAuthenticators')
+def get_authenticators(state, request):
+    return json_response({'installed': ['authn'], 'configured': ['authn'], 'enabled': ['authn']})
+
+
+# ---------- secrets ----------
+
+@operation('getSecret')
+def get_secret(state, request):
+    role_id = _role(state, request)
+    _account(state, request)
+    value = state.get_secret(role_id, _resource_id(state, request), request.integer('version'))
+    return Response(200, value, 'application/octet-stream')
+
+
+@operation('createSecret')
+def create_secret(state, request):
+    role_id = _role(state, request)
+    _account(state, request)
+    if 'expirations' in request.query:
+        state.reset_expiration(role_id, _resource_id(state, request))
+        return Response(201)
+    if not request.body:
+        raise unprocessable('value may not be empty')
+    state.add_secret(role_id, _resource_id(state, request), request.body)
+    return Response(201)
+
+
+@operation('getSecrets')
+def get_secrets(state, request):
+    role_id = _role(state, request)
+    ids = [i for i in (request.arg('variable_ids') or '').split(',') if i]
+    if not ids or any(i.count(':') < 2 for i in ids):
+        raise unprocessable('variable_ids must be a list of fully qualified variable ids')
+    values = state.get_secrets(role_id, ids)
+    if request.base64:
+        encoded = {i: base64.b64encode(value).decode() for i, value in values.items()}
+        response = json_response(encoded)
+        response.headers['Content-Encoding'] = 'base64'
+        return response
+    try:
+        return json_response({i: value.decode() for i, value in values.items()})
+    except UnicodeDecodeError:
+        raise ConjurError(406, 'not_acceptable',
+                          'Binary secrets require the base64 Accept-Encoding')
+
+
+# ---------- policies ----------
+
+def _load_policy(state, request):
+    role_id = _role(state, request)
+    _account(state, request)
+    loaded = state.load_policy(role_id, request.params['identifier'],
+                               request.body.decode('utf-8', 'replace'), request.method)
+    return json_response(loaded, 201)
+
+
+OPERATIONS['loadPolicy'] = OPERATIONS['replacePolicy'] = OPERATIONS['updatePolicy'] = _load_policy
+
+
+# ---------- resources ----------
+
+def _list_resources(state, request):
+    role_id = _role(state, request)
+    account = request.params.get('account', request.arg('account'))
+    kind = request.params.get('kind', request.arg('kind'))
+    acting_as = request.arg('acting_as')
+    resources = state.list_resources(role_id, account, kind, request.arg('search'),
+                                     acting_as and _qualify(state, acting_as))
+    return _page(request, resources)
+
+
+for _operation_id in ('showResourcesForAllAccounts', 'showResourcesForAccount',
+                      'showResourcesForKind'):
+    OPERATIONS[_operation_id] = _list_resources
+
+
+@operation('showResource')
+def show_resource(state, request):
+    role_id = _role(state, request)
+    _account(state, request)
+    resource_id = _resource_id(state, request)
+    if 'check' in request.query:
+        role = request.arg('role')
+        state.check_permission(role_id, resource_id, request.arg('privilege'),
+                               role and _qualify(state, role))
+        return Response(204)
+    if 'permitted_roles' in request.query:
+        raise ConjurError(501, 'not_implemented', 'permitted_roles is not modelled')
+    return json_response(state.show_resource(role_id, resource_id))
+
+
+# ---------- roles ----------
+
+@operation('showRole')
+def show_role(state, request):
+    role_id = _role(state, request)
+    _account(state, request)
+    target = _resource_id(state, request)
+    # only the parameter of the highest priority is answered: graph, all,
+    # memberships, then members
+    if 'graph' in request.query:
+        return json_response(state.role_graph(role_id, target))
+    if 'all' in request.query or 'memberships' in request.query:
+        return _page(request, state.role_memberships(role_id, target,
+                                                     transitive='all' in request.query))
+    if 'members' in request.query:
+        return _page(request, state.role_members(role_id, target, request.arg('search')))
+    return json_response(state.show_role(role_id, target))
+
+
+def _member(state, request):
+    member = request.arg('member')
+    if 'members' not in request.query or not member:
+        raise unprocessable('member must be given')
+    return _qualify(state, member)
+
+
+@operation('addMemberToRole')
+def add_member_to_role(state, request):
+    role_id = _role(state, request)
+    _account(state, request)
+    state.add_member(role_id, _resource_id(state, request), _member(state, request))
+    return Response(204)
+
+
+@operation('removeMemberFromRole')
+def remove_member_from_role(state, request):
+    role_id = _role(state, request)
+    _account(state, request)
+    state.remove_member(role_id, _resource_id(state, request), _member(state, request))
+    return Response(204)
+
+
+@operation('showPublicKeys')
+def show_public_keys(state, request):
+    _account(state, request)
+    keys = state.public_keys(request.params['kind'], request.params['identifier'])
+    return text_response('\n'.join(keys) + ('\n' if keys else ''))
+
+
+# ---------- host factory ----------
+
+@operation('createToken')
+def create_token(state, request):
+    role_id = _role(state, request)
+    form = request.form()
+    count = form.get('count', ['1'])[0]
+    if not count.isdigit():
+        raise unprocessable('count must be a positive integer')
+    tokens = state.create_host_factory_tokens(
+        role_id, form.get('host_factory', [''])[0], form.get('expiration', [''])[0],
+        form.get('cidr', []) + form.get('cidr[]', []), int(count))
+    return json_response(tokens)
+
+
+@operation('revokeToken')
+def revoke_token(state, request):
+    role_id = _role(state, request)
+    state.revoke_host_factory_token(role_id, request.params['token'])
+    return Response(204)
+
+
+@operation('createHost')
+def create_host(state, request):
+    form = request.form()
+    annotations = {key[len('annotations['):-1]: values[0] for key, values in form.items()
+                   if key.startswith('annotations[') and key.endswith(']')}
+    host = state.create_host(request.headers.get('Authorization'),
+                             form.get('id', [''])[0], annotations)
+    return json_response(host, 201)
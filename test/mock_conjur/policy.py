@@ -0,0 +1,74 @@
+"""Parses the subset of Conjur policy YAML the mock understands.
+
+Every `!tag` becomes a Statement; a scalar value is its id, a mapping its
+fields and an empty value a statement without an id (`- !webservice`).
+Tags the mock does not model are rejected with a PolicyError.
+"""
+import yaml
+
+RECORDS = ('variable', 'user', 'host', 'group', 'layer', 'webservice', 'policy',
+           'host-factory', 'host_factory')
+ROLE_RECORDS = ('user', 'host', 'group', 'layer', 'policy')
+STATEMENTS = ('permit', 'deny', 'grant', 'revoke', 'delete')
+
+
+class PolicyError(Exception):
+    """A policy document the mock refuses to load, answered with a 422"""
+
+
+class Statement:
+    """A tagged policy node"""
+    def __init__(self, tag, fields):
+        self.tag = tag
+        self.fields = fields
+
+    @property
+    def kind(self):
+        """The resource kind of a record, as used in resource ids"""
+        return self.tag.replace('-', '_')
+
+    def __repr__(self):
+        return '!{0} {1!r}'.format(self.tag, self.fields)
+
+
+class _Loader(yaml.SafeLoader):
+    """SafeLoader accepting Conjur's `!tag` records"""
+
+
+def _construct(loader, suffix, node):
+    if isinstance(node, yaml.ScalarNode):
+        value = loader.construct_scalar(node)
+        fields = {'id': value} if value != '' else {}
+    elif isinstance(node, yaml.MappingNode):
+        fields = loader.construct_mapping(node, deep=True)
+    else:
+        raise PolicyError('!{0} cannot hold a list'.format(suffix))
+    if suffix not in RECORDS + STATEMENTS:
+        raise PolicyError('Unsupported policy statement !{0}'.format(suffix))
+    return Statement(suffix, fields)
+
+
+_Loader.add_multi_constructor('!', _construct)
+
+
+def parse(text):
+    """Returns the statements of a policy document"""
+    try:
+        statements = yaml.load(text, Loader=_Loader)  # nosec: safe loader subclass
+    except yaml.YAMLError as e:
+        raise PolicyError(str(e))
+    if statements is None:
+        return []
+    if not isinstance(statements, list):
+        raise PolicyError('Policy must be a list of statements')
+    for statement in statements:
+        if not isinstance(statement, Statement):
+            raise PolicyError('Unexpected policy entry {0!r}'.format(statement))
+    return statements
+
+
+def as_list(value):
+    """Policy fields accept a single item or a list of items"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
@@ -0,0 +1,251 @@
+"""The threaded HTTP server in front of the mock state, with fault injection"""
+import collections
+import math
+import random
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .operations import OPERATIONS, Request, Response, json_response
+from .spec import SPEC_FILE, load_routes
+from .state import ConjurError, ConjurState
+
+
+class Fault:
+    """Latency, error injection and rate limiting applied to requests.
+
+    latency plus a uniform random jitter is slept before every response.
+    error_rate is the share of requests answered with error_status instead
+    of reaching the state, with a Retry-After header when retry_after is set.
+    rate_limit requests per second are allowed through a token bucket of
+    burst requests; requests over the limit get a 429 with the Retry-After
+    the bucket needs to refill.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 retry_after=None, rate_limit=None, burst=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.burst = burst or (max(1, int(rate_limit)) if rate_limit else None)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def throttle(self):
+        """Takes a token from the bucket, returns the seconds to wait if empty"""
+        if not self.rate_limit:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate_limit
+
+    def delay(self, rng):
+        return self.latency + (rng.uniform(0, self.jitter) if self.jitter else 0)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockConjur'
+    # headers and body are written separately, Nagle would hold the body back
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _dispatch(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        response = self.server.mock.handle(self.command, self.path, self.headers, body,
+                                           self.client_address[0])
+        self.send_response(response.status)
+        if response.content_type:
+            self.send_header('Content-Type', response.content_type)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(response.body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(response.body)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _dispatch
+
+
+class MockConjur:
+    """A stateful Conjur stand-in serving the operations of spec/openapi.yml.
+
+    Requests are routed with the paths and operationIds of the spec. Secrets,
+    policies, roles, resources, host factories and authentication are kept
+    in a ConjurState; other documented operations answer with the example
+    response of the spec, or 501 when it has none.
+
+    `fault` applies to every request, `faults` maps operationIds to a Fault
+    replacing it for that operation. Both can be changed while the server
+    runs. `seed` makes the injected errors and jitter reproducible.
+    """
+    def __init__(self, account='dev', admin_api_key=None, host='127.0.0.1', port=0,
+                 certfile=None, keyfile=None, spec_file=SPEC_FILE, seed=None, **fault):
+        self.state = ConjurState(account, admin_api_key)
+        self.routes = load_routes(spec_file)
+        self.fault = Fault(**fault)
+        self.faults = {}
+        self.calls = collections.Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._address = (host, port)
+        self._ssl_context = None
+        if certfile:
+            self._ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self._ssl_context.load_cert_chain(certfile, keyfile)
+        self._server = None
+        self._thread = None
+
+    @property
+    def account(self):
+        return self.state.account
+
+    @property
+    def admin_api_key(self):
+        return self.state.admin_api_key
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        scheme = 'https' if self._ssl_context else 'http'
+        return '{0}://{1}:{2}'.format(scheme, host, port)
+
+    def start(self):
+        """Starts serving on a background thread"""
+        self._server = _Server(self._address, _Handler)
+        if self._ssl_context:
+            self._server.socket = self._ssl_context.wrap_socket(self._server.socket,
+                                                                server_side=True)
+        self._server.mock = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05},
+                                        name='mock-conjur', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Blocks the calling thread until interrupted"""
+        if self._server is None:
+            self.start()
+        try:
+            self._thread.join()
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def set_fault(self, operation_id=None, **settings):
+        """Replaces the fault of one operation, or of every request"""
+        if operation_id is None:
+            self.fault = Fault(**settings)
+        else:
+            self.faults[operation_id] = Fault(**settings)
+
+    def load_policy(self, text, identifier='root', method='PUT'):
+        """Loads a policy as the admin user, for seeding state in tests"""
+        admin = self.state.full_id('user', 'admin')
+        return self.state.load_policy(admin, identifier, text, method)
+
+    def add_secret(self, variable, value):
+        """Stores a secret value as the admin user"""
+        if isinstance(value, str):
+            value = value.encode()
+        admin = self.state.full_id('user', 'admin')
+        self.state.add_secret(admin, self.state.full_id('variable', variable), value)
+
+    def route(self, method, path):
+        """Returns the spec route of a request and its path parameters"""
+        for route in self.routes:
+            params = route.match(method, path)
+            if params is not None:
+                return route, params
+        return None, {}
+
+    def handle(self, method, target, headers, body, client_address=None):
+        """Answers one request, applying the configured faults first"""
+        url = urlsplit(target)
+        route, params = self.route(method, url.path)
+        operation_id = route.operation_id if route else None
+        fault = self.faults.get(operation_id, self.fault)
+        with self._lock:
+            self.calls[operation_id] += 1
+            delay = fault.delay(self._random)
+            failed = fault.error_rate and self._random.random() < fault.error_rate
+
+        wait = fault.throttle()
+        if wait:
+            response = json_response({'error': {'code': 'too_many_requests',
+                                                'message': 'Rate limit exceeded'}}, 429)
+            response.headers['Retry-After'] = str(math.ceil(wait))
+            return response
+        if delay:
+            time.sleep(delay)
+        if failed:
+            response = json_response({'error': {'code': 'injected',
+                                                'message': 'Injected failure'}},
+                                     fault.error_status)
+            if fault.retry_after is not None:
+                response.headers['Retry-After'] = str(fault.retry_after)
+            return response
+
+        # nginx rejects null bytes in paths, Conjur fails to validate them in queries
+        if '\x00' in unquote(url.path):
+            return Response(400, b'Bad Request', 'text/plain')
+        if '%00' in url.query:
+            return json_response({'error': {'code': 'unprocessable_entity',
+                                            'message': 'Invalid parameter'}}, 422)
+        if route is None:
+            return json_response({'error': {'code': 'not_found',
+                                            'message': 'No route matches ' + url.path}}, 404)
+
+        request = Request(method, params, parse_qs(url.query, keep_blank_values=True),
+                          headers, body, client_address)
+        handler = OPERATIONS.get(operation_id)
+        try:
+            if handler is not None:
+                return handler(self.state, request)
+        except ConjurError as e:
+            return Response(e.status, e.body(), 'application/json' if e.code else None)
+        return self._example(route)
+
+    @staticmethod
+    def _example(route):
+        # only bodiless successes can be answered without a documented example
+        if route.example is None or route.example[2] is None and route.example[0] != 204:
+            return json_response({'error': {'code': 'not_implemented', 'message':
+                                            route.operation_id + ' is not modelled'}}, 501)
+        status, content_type, example = route.example
+        if example is None:
+            return Response(status)
+        if content_type == 'application/json':
+            return json_response(example, status)
+        return Response(status, str(example).encode(), content_type)
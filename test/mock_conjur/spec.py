@@ -0,0 +1,100 @@
+"""Builds the mock's route table from the OpenAPI description in spec/"""
+import functools
+import pathlib
+import re
+from urllib.parse import unquote
+
+import yaml
+
+SPEC_FILE = pathlib.Path(__file__).resolve().parents[2] / 'spec' / 'openapi.yml'
+
+METHODS = ('get', 'put', 'post', 'delete', 'patch', 'head', 'options')
+
+# libyaml parses the spec several times faster when PyYAML was built with it
+_SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class Route:
+    """One operation of the spec: its method, path template and operationId.
+    `example` holds the (status, content type, example body) of the first
+    documented 2xx response that has one, for operations the mock does not
+    model."""
+    def __init__(self, method, template, operation_id, example=None):
+        self.method = method
+        self.template = template
+        self.operation_id = operation_id
+        self.example = example
+        self.params = re.findall(r'{([^}/]+)}', template)
+        literals = re.split(r'{[^}/]+}', template)
+        self.regex = re.compile('([^/]+)'.join(map(re.escape, literals)) + '$')
+        # literal segments outrank parameters, so /authn-gcp/{account}/status
+        # is tried before /{authenticator}/{service_id}/{account}/status
+        self.specificity = (len(template.split('/')) - len(self.params),
+                            len(template.split('/')))
+
+    def match(self, method, path):
+        """Returns the unquoted path parameters if the request is this operation"""
+        if method != self.method:
+            return None
+        found = self.regex.match(path)
+        if found is None:
+            return None
+        return {name: unquote(value) for name, value in zip(self.params, found.groups())}
+
+
+class _Documents:
+    """Loads spec files on demand and resolves `file#/pointer` references"""
+    def __init__(self, root):
+        self.root = pathlib.Path(root)
+        self.files = {}
+
+    def load(self, name):
+        if name not in self.files:
+            with open(self.root.parent / name, 'r', encoding='utf-8') as spec:
+                self.files[name] = yaml.load(spec, Loader=_SafeLoader)
+        return self.files[name]
+
+    def resolve(self, node, current):
+        """Follows $ref until a concrete node is found, returns it and its file"""
+        while isinstance(node, dict) and '$ref' in node:
+            target, _, pointer = node['$ref'].partition('#')
+            current = target or current
+            node = self.load(current)
+            for part in filter(None, pointer.split('/')):
+                node = node[part.replace('~1', '/').replace('~0', '~')]
+        return node, current
+
+
+def _example(documents, operation, current):
+    """Picks a documented example response for an operation"""
+    for status, response in sorted(operation.get('responses', {}).items(),
+                                   key=lambda item: str(item[0])):
+        if not str(status).startswith('2'):
+            continue
+        response, where = documents.resolve(response, current)
+        for content_type, content in (response.get('content') or {}).items():
+            schema, _ = documents.resolve(content.get('schema', {}), where)
+            example = content.get('example', schema.get('example'))
+            if example is not None:
+                return int(status), content_type, example
+        return int(status), None, None
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def load_routes(spec_file=SPEC_FILE):
+    """Returns a Route for every operation in the spec, most specific first.
+    Routes are read only, so every mock built from a spec file shares them."""
+    documents = _Documents(spec_file)
+    root_name = pathlib.Path(spec_file).name
+    routes = []
+    for template, item in documents.load(root_name)['paths'].items():
+        item, current = documents.resolve(item, root_name)
+        for method in METHODS:
+            if method not in item:
+                continue
+            operation = item[method]
+            routes.append(Route(method.upper(), template, operation['operationId'],
+                                _example(documents, operation, current)))
+    routes.sort(key=lambda route: route.specificity, reverse=True)
+    return tuple(routes)
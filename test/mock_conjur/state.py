@@ -0,0 +1,752 @@
+"""The in-memory Conjur account the mock server answers from.
+
+Roles, resources, permissions and memberships follow Conjur's RBAC model
+closely enough for the client to see the same status codes: resources a
+role has no privilege on are reported missing (404), visible resources
+without the needed privilege are forbidden (403). Owning a role makes the
+owner an admin member of it, and a resource's owner holds every privilege
+on it, so the admin user reaches everything through the root policy.
+"""
+import base64
+import copy
+import datetime
+import hashlib
+import hmac
+import json
+import re
+import secrets
+import string
+import threading
+import time
+
+from . import policy as policy_yaml
+
+TOKEN_TTL = 8 * 60
+SECRET_VERSIONS = 20
+API_KEY_ALPHABET = string.digits + string.ascii_lowercase
+ROLE_KINDS = ('user', 'host', 'group', 'layer', 'policy')
+
+
+class ConjurError(Exception):
+    """A request Conjur would reject, with the status and error code it uses"""
+    def __init__(self, status, code=None, message=None):
+        super().__init__(message or code or str(status))
+        self.status = status
+        self.code = code
+        self.message = message
+
+    def body(self):
+        """The JSON error document, empty for 401s as in Conjur"""
+        if self.code is None:
+            return b''
+        return json.dumps({'error': {'code': self.code, 'message': self.message}}).encode()
+
+
+def unauthorized():
+    return ConjurError(401)
+
+
+def forbidden():
+    return ConjurError(403, 'forbidden', 'Forbidden')
+
+
+def not_found(message):
+    return ConjurError(404, 'not_found', message)
+
+
+def unprocessable(message):
+    return ConjurError(422, 'unprocessable_entity', message)
+
+
+def new_api_key():
+    """An api key in Conjur's format"""
+    return ''.join(secrets.choice(API_KEY_ALPHABET) for _ in range(55))
+
+
+def _timestamp(moment=None):
+    moment = moment or datetime.datetime.now(datetime.timezone.utc)
+    return moment.isoformat(timespec='milliseconds')
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode()
+
+
+class Resource:
+    """A resource and, for role kinds, the role data sharing its id"""
+    def __init__(self, resource_id, owner, policy):
+        self.id = resource_id
+        self.account, self.kind, self.identifier = resource_id.split(':', 2)
+        self.owner = owner
+        self.policy = policy
+        self.created_at = _timestamp()
+        # name -> (value, policy)
+        self.annotations = {}
+        # (privilege, role, policy)
+        self.permissions = set()
+        self.secrets = []
+        self.layers = []
+        # role data, only used for ROLE_KINDS
+        self.members = {}
+        self.api_key = None
+        self.password = None
+        self.public_keys = []
+        self.restricted_to = []
+
+    @property
+    def is_role(self):
+        return self.kind in ROLE_KINDS
+
+    def to_json(self):
+        """The resource as listed by the resources endpoints"""
+        data = {
+            'created_at': self.created_at,
+            'id': self.id,
+            'owner': self.owner,
+            'permissions': [{'privilege': privilege, 'role': role, 'policy': policy}
+                            for privilege, role, policy in sorted(self.permissions)],
+            'annotations': [{'name': name, 'value': value, 'policy': policy}
+                            for name, (value, policy) in sorted(self.annotations.items())],
+        }
+        if self.policy is not None:
+            data['policy'] = self.policy
+        if self.kind == 'variable':
+            data['secrets'] = [{'version': version}
+                               for version in range(max(1, len(self.secrets) - SECRET_VERSIONS + 1),
+                                                    len(self.secrets) + 1)]
+        if self.kind in ('user', 'host'):
+            data['restricted_to'] = list(self.restricted_to)
+        if self.kind == 'host_factory':
+            data['layers'] = list(self.layers)
+        return data
+
+    def role_json(self):
+        """The role as shown by the roles endpoint"""
+        data = {
+            'created_at': self.created_at,
+            'id': self.id,
+            'owner': self.owner,
+            'members': [membership.to_json() for _, membership in sorted(self.members.items())],
+        }
+        if self.policy is not None:
+            data['policy'] = self.policy
+        return data
+
+
+class Membership:
+    """A member of a role, granted by a policy, the API or ownership"""
+    def __init__(self, role, member, admin_option=False, ownership=False, policy=None):
+        self.role = role
+        self.member = member
+        self.admin_option = admin_option
+        self.ownership = ownership
+        self.policy = policy
+
+    def to_json(self):
+        data = {'admin_option': self.admin_option, 'ownership': self.ownership,
+                'role': self.role, 'member': self.member}
+        if self.policy is not None:
+            data['policy'] = self.policy
+        return data
+
+
+class HostFactoryToken:
+    def __init__(self, host_factory, expiration, cidr):
+        self.host_factory = host_factory
+        self.expiration = expiration
+        self.cidr = cidr
+
+    def to_json(self, token):
+        return {'expiration': _timestamp(self.expiration), 'cidr': self.cidr, 'token': token}
+
+
+class ConjurState:
+    """A single Conjur account. Every public method takes the lock, so the
+    threaded server can call them concurrently."""
+    def __init__(self, account='dev', admin_api_key=None):
+        self.account = account
+        self.lock = threading.RLock()
+        self.resources = {}
+        # member id -> ids of the roles it is a direct member of
+        self.member_of = {}
+        self.host_factory_tokens = {}
+        self.policy_versions = {}
+        self._signing_key = secrets.token_bytes(32)
+
+        admin = self.full_id('user', 'admin')
+        self._add_record(admin, admin, None)
+        self._add_record(self.full_id('policy', 'root'), admin, None)
+        self.resources[admin].api_key = admin_api_key or new_api_key()
+
+    def full_id(self, kind, identifier):
+        return '{0}:{1}:{2}'.format(self.account, kind, identifier)
+
+    @property
+    def admin_api_key(self):
+        return self.resources[self.full_id('user', 'admin')].api_key
+
+    # ---------- RBAC ----------
+
+    def effective_roles(self, role_id, ownership=True):
+        """The role and every role it is a member of, transitively. Without
+        ownership only granted memberships are followed."""
+        found = {role_id}
+        pending = [role_id]
+        while pending:
+            member = pending.pop()
+            for parent in self.member_of.get(member, ()):
+                if not ownership and self.resources[parent].members[member].ownership:
+                    continue
+                if parent not in found:
+                    found.add(parent)
+                    pending.append(parent)
+        return found
+
+    @staticmethod
+    def _holds(roles, resource, privilege=None):
+        if resource.owner in roles:
+            return True
+        return any(role in roles and (privilege is None or granted == privilege)
+                   for granted, role, _ in resource.permissions)
+
+    def _visible(self, role_id, resource_id, roles=None):
+        """Returns the resource if the role may know it exists"""
+        resource = self.resources.get(resource_id)
+        if resource is None:
+            return None
+        roles = roles or self.effective_roles(role_id)
+        # roles see themselves and the roles they belong to
+        if resource.id in roles or self._holds(roles, resource):
+            return resource
+        return None
+
+    def _require(self, role_id, resource_id, privilege):
+        """Returns the resource, or raises the 404 or 403 Conjur would answer"""
+        roles = self.effective_roles(role_id)
+        resource = self._visible(role_id, resource_id, roles)
+        if resource is None:
+            raise not_found('{0} not found'.format(resource_id))
+        if not self._holds(roles, resource, privilege):
+            raise forbidden()
+        return resource
+
+    def permitted(self, role_id, privilege, resource_id):
+        with self.lock:
+            resource = self.resources.get(resource_id)
+            return resource is not None and self._holds(
+                self.effective_roles(role_id), resource, privilege)
+
+    def _add_record(self, resource_id, owner, policy):
+        """Creates or re-declares a record, returns it and whether it is new"""
+        resource = self.resources.get(resource_id)
+        new = resource is None
+        if new:
+            resource = Resource(resource_id, owner, policy)
+            self.resources[resource_id] = resource
+        else:
+            resource.policy = policy
+        self._set_owner(resource, owner)
+        return resource, new
+
+    def _set_owner(self, resource, owner):
+        if resource.is_role:
+            current = resource.members.get(resource.owner)
+            if current is not None and current.ownership and resource.owner != owner:
+                self._revoke(resource.id, resource.owner)
+        resource.owner = owner
+        if resource.is_role and owner != resource.id:
+            self._grant(resource.id, owner, admin_option=True, ownership=True,
+                        policy=resource.policy)
+
+    def _grant(self, role_id, member_id, admin_option=False, ownership=False, policy=None):
+        self.resources[role_id].members[member_id] = Membership(
+            role_id, member_id, admin_option, ownership, policy)
+        self.member_of.setdefault(member_id, set()).add(role_id)
+
+    def _revoke(self, role_id, member_id):
+        role = self.resources.get(role_id)
+        if role is not None:
+            role.members.pop(member_id, None)
+        self.member_of.get(member_id, set()).discard(role_id)
+
+    def _delete(self, resource_id):
+        resource = self.resources.pop(resource_id, None)
+        if resource is None:
+            return
+        for member_id in list(resource.members):
+            self._revoke(resource_id, member_id)
+        for role_id in list(self.member_of.pop(resource_id, ())):
+            self.resources[role_id].members.pop(resource_id, None)
+        for other in self.resources.values():
+            if any(role == resource_id for _, role, _ in other.permissions):
+                other.permissions = {p for p in other.permissions if p[1] != resource_id}
+        for token, data in list(self.host_factory_tokens.items()):
+            if data.host_factory == resource_id:
+                del self.host_factory_tokens[token]
+
+    # ---------- authentication ----------
+
+    def login_role(self, login):
+        """The role id for an authn login, `host/` prefixed for hosts"""
+        if login.startswith('host/'):
+            return self.full_id('host', login[len('host/'):])
+        return self.full_id('user', login)
+
+    def authenticate(self, account, login, credential):
+        """Checks an api key (or password) and returns the role id"""
+        with self.lock:
+            if account != self.account:
+                raise unauthorized()
+            role = self.resources.get(self.login_role(login))
+            if role is None or credential is None or credential not in (role.api_key, role.password):
+                raise unauthorized()
+            return role.id
+
+    def issue_token(self, role_id):
+        """Returns a signed access token, in the JSON form Conjur returns"""
+        _, kind, identifier = role_id.split(':', 2)
+        login = identifier if kind == 'user' else '{0}/{1}'.format(kind, identifier)
+        now = int(time.time())
+        protected = _b64(json.dumps({'alg': 'HS256', 'kid': 'mock-conjur'}).encode())
+        payload = _b64(json.dumps({'sub': login, 'iat': now, 'exp': now + TOKEN_TTL}).encode())
+        signature = _b64(hmac.new(self._signing_key, (protected + '.' + payload).encode(),
+                                  hashlib.sha256).digest())
+        return json.dumps({'protected': protected, 'payload': payload, 'signature': signature})
+
+    def token_role(self, authorization):
+        """Returns the role the `Token token="..."` header authenticates"""
+        claims = self._token_claims(authorization)
+        if claims is None or claims.get('exp', 0) < time.time():
+            raise unauthorized()
+        with self.lock:
+            role_id = self.login_role(claims['sub'])
+            if role_id not in self.resources:
+                raise unauthorized()
+            return role_id, claims
+
+    def _token_claims(self, authorization):
+        found = re.match(r'Token token="(.*)"$', authorization or '')
+        if found is None:
+            return None
+        value = found.group(1)
+        try:
+            if not value.startswith('{'):
+                value = base64.b64decode(value, validate=False).decode()
+            token = json.loads(value)
+            expected = _b64(hmac.new(self._signing_key,
+                                     (token['protected'] + '.' + token['payload']).encode(),
+                                     hashlib.sha256).digest())
+            if not hmac.compare_digest(expected, token['signature']):
+                return None
+            return json.loads(base64.urlsafe_b64decode(token['payload']))
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def rotate_api_key(self, role_id, target_id=None):
+        with self.lock:
+            target_id = target_id or role_id
+            resource = self._require(role_id, target_id, 'update') if target_id != role_id \
+                else self.resources[role_id]
+            if resource.kind not in ('user', 'host'):
+                raise unprocessable('{0} has no api key'.format(target_id))
+            resource.api_key = new_api_key()
+            return resource.api_key
+
+    def change_password(self, role_id, password):
+        if (len(password) < 12 or len(re.findall('[A-Z]', password)) < 2
+                or len(re.findall('[a-z]', password)) < 2
+                or not re.search('[0-9]', password) or not re.search('[^A-Za-z0-9]', password)):
+            raise unprocessable('password does not meet the complexity requirements')
+        with self.lock:
+            self.resources[role_id].password = password
+
+    # ---------- policies ----------
+
+    def load_policy(self, role_id, identifier, text, method):
+        """Applies a policy document like POST, PUT or PATCH /policies would"""
+        with self.lock:
+            policy = self._require(role_id, self.full_id('policy', identifier),
+                                   'create' if method == 'POST' else 'update')
+            try:
+                statements = policy_yaml.parse(text)
+            except policy_yaml.PolicyError as e:
+                raise unprocessable(str(e))
+            snapshot = copy.deepcopy((self.resources, self.member_of, self.host_factory_tokens))
+            try:
+                created = _PolicyLoad(self, policy, method).run(statements)
+            except policy_yaml.PolicyError as e:
+                self.resources, self.member_of, self.host_factory_tokens = snapshot
+                raise unprocessable(str(e))
+            except ConjurError:
+                self.resources, self.member_of, self.host_factory_tokens = snapshot
+                raise
+            version = self.policy_versions.get(policy.id, 0) + 1
+            self.policy_versions[policy.id] = version
+            return {'created_roles': created, 'version': version}
+
+    # ---------- secrets ----------
+
+    def add_secret(self, role_id, resource_id, value):
+        with self.lock:
+            resource = self._require(role_id, resource_id, 'update')
+            resource.secrets.append(value)
+            del resource.secrets[:-SECRET_VERSIONS]
+
+    def reset_expiration(self, role_id, resource_id):
+        """Secrets never expire in the mock, only the privilege is checked"""
+        with self.lock:
+            self._require(role_id, resource_id, 'update')
+
+    def get_secret(self, role_id, resource_id, version=None):
+        with self.lock:
+            resource = self._require(role_id, resource_id, 'execute')
+            if not resource.secrets:
+                raise not_found('{0} is empty or not found'.format(resource_id))
+            if version is None:
+                return resource.secrets[-1]
+            if not 1 <= version <= len(resource.secrets):
+                raise not_found('{0} has no version {1}'.format(resource_id, version))
+            return resource.secrets[version - 1]
+
+    def get_secrets(self, role_id, resource_ids):
+        with self.lock:
+            return {resource_id: self.get_secret(role_id, resource_id)
+                    for resource_id in resource_ids}
+
+    # ---------- resources ----------
+
+    def list_resources(self, role_id, account=None, kind=None, search=None, acting_as=None):
+        with self.lock:
+            if acting_as is not None:
+                # assuming a role takes a granted membership, owning it is not enough
+                if acting_as not in self.effective_roles(role_id, ownership=False):
+                    raise forbidden()
+                role_id = acting_as
+            roles = self.effective_roles(role_id)
+            search = search.lower() if search else None
+            found = []
+            for resource_id in sorted(self.resources):
+                resource = self.resources[resource_id]
+                if account and resource.account != account or kind and resource.kind != kind:
+                    continue
+                if search and search not in resource.identifier.lower() and not any(
+                        search in value.lower() for value, _ in resource.annotations.values()):
+                    continue
+                if self._visible(role_id, resource_id, roles) is not None:
+                    found.append(resource.to_json())
+            return found
+
+    def show_resource(self, role_id, resource_id):
+        with self.lock:
+            resource = self._visible(role_id, resource_id)
+            if resource is None:
+                raise not_found('{0} not found'.format(resource_id))
+            return resource.to_json()
+
+    def check_permission(self, role_id, resource_id, privilege, other_role=None):
+        """Answers `?check=true`: a failed check of the caller's own
+        privileges is a 404, of another role's a 403"""
+        with self.lock:
+            if self._visible(role_id, resource_id) is None:
+                raise not_found('{0} not found'.format(resource_id))
+            if other_role is None:
+                if not self.permitted(role_id, privilege, resource_id):
+                    raise not_found('{0} not found'.format(resource_id))
+            elif other_role not in self.resources or not self.permitted(
+                    other_role, privilege, resource_id):
+                raise forbidden()
+
+    # ---------- roles ----------
+
+    def _role(self, role_id, target_id):
+        resource = self._visible(role_id, target_id)
+        if resource is None or not resource.is_role:
+            raise not_found('Role {0} not found'.format(target_id))
+        return resource
+
+    def show_role(self, role_id, target_id):
+        with self.lock:
+            return self._role(role_id, target_id).role_json()
+
+    def role_members(self, role_id, target_id, search=None):
+        with self.lock:
+            members = self._role(role_id, target_id).role_json()['members']
+            if search:
+                members = [m for m in members if search.lower() in m['member'].lower()]
+            return members
+
+    def role_memberships(self, role_id, target_id, transitive=False):
+        with self.lock:
+            self._role(role_id, target_id)
+            if transitive:
+                return sorted(self.effective_roles(target_id))
+            return sorted(self.member_of.get(target_id, ()))
+
+    def role_graph(self, role_id, target_id):
+        """The memberships above and below a role, as parent and child edges"""
+        with self.lock:
+            self._role(role_id, target_id)
+            edges = set()
+            pending, seen = [target_id], {target_id}
+            while pending:
+                child = pending.pop()
+                for parent in self.member_of.get(child, ()):
+                    edges.add((parent, child))
+                    if parent not in seen:
+                        seen.add(parent)
+                        pending.append(parent)
+            pending, seen = [target_id], {target_id}
+            while pending:
+                parent = pending.pop()
+                for child in self.resources[parent].members:
+                    edges.add((parent, child))
+                    if child not in seen:
+                        seen.add(child)
+                        pending.append(child)
+            return [{'parent': parent, 'child': child} for parent, child in sorted(edges)]
+
+    def _admin_of(self, role_id, target):
+        roles = self.effective_roles(role_id)
+        return target.owner in roles or any(
+            membership.admin_option and member in roles
+            for member, membership in target.members.items())
+
+    def add_member(self, role_id, target_id, member_id):
+        with self.lock:
+            target = self._role(role_id, target_id)
+            if member_id not in self.resources or not self.resources[member_id].is_role:
+                raise not_found('Role {0} not found'.format(member_id))
+            if not self._admin_of(role_id, target):
+                raise forbidden()
+            if member_id not in target.members:
+                self._grant(target_id, member_id)
+
+    def remove_member(self, role_id, target_id, member_id):
+        with self.lock:
+            target = self._role(role_id, target_id)
+            membership = target.members.get(member_id)
+            if membership is None:
+                raise not_found('{0} is not a member of {1}'.format(member_id, target_id))
+            if not self._admin_of(role_id, target):
+                raise forbidden()
+            self._revoke(target_id, member_id)
+
+    def public_keys(self, kind, identifier):
+        with self.lock:
+            resource = self.resources.get(self.full_id(kind, identifier))
+            if resource is None:
+                return []
+            return list(resource.public_keys)
+
+    # ---------- host factory ----------
+
+    def create_host_factory_tokens(self, role_id, host_factory_id, expiration, cidr=(),
+                                   count=1):
+        try:
+            expires = datetime.datetime.fromisoformat(expiration.replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            raise unprocessable('expiration must be an ISO 8601 timestamp')
+        if expires.tzinfo is None:
+            expires = expires.replace(tzinfo=datetime.timezone.utc)
+        with self.lock:
+            self._require(role_id, host_factory_id, 'execute')
+            created = []
+            for _ in range(count):
+                token = new_api_key()
+                self.host_factory_tokens[token] = HostFactoryToken(
+                    host_factory_id, expires, list(cidr))
+                created.append(self.host_factory_tokens[token].to_json(token))
+            return created
+
+    def revoke_host_factory_token(self, role_id, token):
+        with self.lock:
+            data = self.host_factory_tokens.get(token)
+            if data is None:
+                raise not_found('Host factory token not found')
+            self._require(role_id, data.host_factory, 'update')
+            del self.host_factory_tokens[token]
+
+    def create_host(self, authorization, identifier, annotations=None):
+        """Creates (or re-keys) a host with a host factory token"""
+        found = re.match(r'Token token="(.*)"$', authorization or '')
+        with self.lock:
+            data = found and self.host_factory_tokens.get(found.group(1))
+            if not data or data.expiration < datetime.datetime.now(datetime.timezone.utc):
+                raise unauthorized()
+            if not identifier:
+                raise unprocessable('id must not be blank')
+            factory = self.resources[data.host_factory]
+            policy = self.resources[factory.policy]
+            prefix = '' if policy.identifier == 'root' else policy.identifier + '/'
+            host, _ = self._add_record(self.full_id('host', prefix + identifier),
+                                       factory.id, factory.policy)
+            for name, value in (annotations or {}).items():
+                host.annotations[name] = (value, factory.policy)
+            for layer in factory.layers:
+                self._grant(layer, host.id, policy=factory.policy)
+            host.api_key = new_api_key()
+            data = host.to_json()
+            data['api_key'] = host.api_key
+            return data
+
+
+class _PolicyLoad:
+    """Applies the statements of one policy document to the state.
+
+    Records are declared first, so permits and grants may refer to records
+    further down the document. PUT forgets everything the replaced policy
+    and its sub-policies declared before applying the document, keeping the
+    secrets and api keys of records that are declared again.
+    """
+    def __init__(self, state, policy, method):
+        self.state = state
+        self.policy = policy
+        self.method = method
+        self.declared = set()
+        self.created = {}
+        self.deferred = []
+
+    def run(self, statements):
+        state = self.state
+        replaced = self._subtree() if self.method == 'PUT' else set()
+        for resource in state.resources.values():
+            resource.permissions = {p for p in resource.permissions if p[2] not in replaced}
+            for name, (_, policy) in list(resource.annotations.items()):
+                if policy in replaced:
+                    del resource.annotations[name]
+            for member, membership in list(resource.members.items()):
+                if membership.policy in replaced and not membership.ownership:
+                    state._revoke(resource.id, member)
+
+        self._records(statements, self.policy)
+        for statement, policy in self.deferred:
+            self._statement(statement, policy)
+
+        for resource_id in [resource.id for resource in state.resources.values()
+                            if resource.policy in replaced and resource.id not in self.declared]:
+            state._delete(resource_id)
+        return self.created
+
+    def _subtree(self):
+        """The ids of the policy and every policy declared below it"""
+        found = {self.policy.id}
+        grew = True
+        while grew:
+            nested = {resource.id for resource in self.state.resources.values()
+                      if resource.kind == 'policy' and resource.policy in found}
+            grew = not nested <= found
+            found |= nested
+        return found
+
+    @staticmethod
+    def _prefix(policy):
+        return '' if policy.identifier == 'root' else policy.identifier + '/'
+
+    def _identifier(self, kind, identifier, policy):
+        prefix = self._prefix(policy)
+        if identifier.startswith('/'):
+            return identifier[1:]
+        if kind == 'user' and prefix and '@' not in identifier:
+            return '{0}@{1}'.format(identifier, prefix.rstrip('/').replace('/', '-'))
+        return prefix + identifier
+
+    def _ref(self, statement, policy):
+        """Resolves a `!kind id` reference to the id of an existing record"""
+        if not isinstance(statement, policy_yaml.Statement) or statement.tag not in policy_yaml.RECORDS:
+            raise policy_yaml.PolicyError('Expected a record reference, got {0!r}'.format(statement))
+        if 'id' not in statement.fields:
+            identifier = policy.identifier
+        elif statement.kind == 'policy' and statement.fields['id'] == 'root':
+            identifier = 'root'
+        else:
+            identifier = self._identifier(statement.kind, str(statement.fields['id']), policy)
+        resource_id = self.state.full_id(statement.kind, identifier)
+        if resource_id not in self.state.resources:
+            raise not_found('{0} not found'.format(resource_id))
+        return resource_id
+
+    def _records(self, statements, policy):
+        for statement in statements:
+            if statement.tag in policy_yaml.STATEMENTS:
+                if self.method == 'POST' and statement.tag in ('deny', 'revoke', 'delete'):
+                    raise policy_yaml.PolicyError(
+                        '!{0} is not allowed when loading a policy with POST'.format(statement.tag))
+                self.deferred.append((statement, policy))
+            else:
+                self._record(statement, policy)
+
+    def _record(self, statement, policy):
+        state = self.state
+        fields = statement.fields
+        kind = statement.kind
+        if 'id' in fields:
+            identifier = self._identifier(kind, str(fields['id']), policy)
+        elif policy.identifier != 'root':
+            identifier = policy.identifier
+        else:
+            raise policy_yaml.PolicyError('!{0} needs an id in the root policy'.format(statement.tag))
+        resource_id = state.full_id(kind, identifier)
+        if 'owner' in fields:
+            owner = self._ref(fields['owner'], policy)
+        else:
+            owner = policy.id
+        resource, new = state._add_record(resource_id, owner, policy.id)
+        self.declared.add(resource_id)
+
+        for name, value in (fields.get('annotations') or {}).items():
+            resource.annotations[str(name)] = (str(value), policy.id)
+        if kind == 'variable':
+            for field in ('kind', 'mime_type'):
+                if field in fields:
+                    resource.annotations['conjur/' + field] = (str(fields[field]), policy.id)
+        if kind in ('user', 'host'):
+            if new or resource.api_key is None:
+                resource.api_key = new_api_key()
+                self.created[resource_id] = {'id': resource_id, 'api_key': resource.api_key}
+            resource.public_keys = [str(key) for key in policy_yaml.as_list(fields.get('public_keys'))]
+            resource.restricted_to = [str(cidr) for cidr in
+                                      policy_yaml.as_list(fields.get('restricted_to'))]
+        if kind == 'host_factory':
+            self.deferred.append((policy_yaml.Statement('layers', {
+                'host_factory': resource_id, 'layers': fields.get('layers')}), policy))
+        if kind == 'policy':
+            self._records(policy_yaml.as_list(fields.get('body')), resource)
+
+    def _statement(self, statement, policy):
+        state = self.state
+        fields = statement.fields
+
+        def refs(*names):
+            for name in names:
+                if name in fields:
+                    return [self._ref(ref, policy) for ref in policy_yaml.as_list(fields[name])]
+            raise policy_yaml.PolicyError('!{0} needs {1}'.format(statement.tag, names[0]))
+
+        if statement.tag == 'layers':
+            state.resources[fields['host_factory']].layers = [
+                self._ref(ref, policy) for ref in policy_yaml.as_list(fields['layers'])]
+        elif statement.tag in ('permit', 'deny'):
+            privileges = fields.get('privileges', fields.get('privilege'))
+            if not privileges:
+                raise policy_yaml.PolicyError('!{0} needs privileges'.format(statement.tag))
+            for resource_id in refs('resource', 'resources'):
+                resource = state.resources[resource_id]
+                for role in refs('role', 'roles'):
+                    for privilege in policy_yaml.as_list(privileges):
+                        if statement.tag == 'permit':
+                            resource.permissions.add((str(privilege), role, policy.id))
+                        else:
+                            resource.permissions = {p for p in resource.permissions
+                                                    if p[:2] != (str(privilege), role)}
+        elif statement.tag in ('grant', 'revoke'):
+            for role in refs('role', 'roles'):
+                if not state.resources[role].is_role:
+                    raise policy_yaml.PolicyError('{0} is not a role'.format(role))
+                for member in refs('member', 'members'):
+                    if statement.tag == 'grant':
+                        state._grant(role, member, policy=policy.id)
+                    else:
+                        state._revoke(role, member)
+        elif statement.tag == 'delete':
+            for resource_id in refs('record'):
+                state._delete(resource_id)
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+import conjur
+
+from .. import api_config
+from ..api_config import CONJUR_AUTHN_API_KEY
+
+TEST_VARIABLE = 'testSecret'
+
+
+class TestAccessTokenProvider(api_config.ConfiguredTest):
+    """AccessTokenProvider integration tests. Ensures clients authenticated through a
+    token provider fetch, share and refresh their access tokens"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.api_key = os.environ[CONJUR_AUTHN_API_KEY]
+        conjur.api.SecretsApi(cls.client).create_secret(
+            cls.account,
+            'variable',
+            TEST_VARIABLE,
+            body='provider secret'
+        )
+
+    def setUp(self):
+        self.provider = conjur.AccessTokenProvider(self.account, 'admin', self.api_key)
+        self.provider_client = conjur.ApiClient(
+            api_config.get_api_config(),
+            token_provider=self.provider
+        )
+        self.api = conjur.api.SecretsApi(self.provider_client)
+
+    def tearDown(self):
+        self.provider_client.close()
+
+    def count_authentications(self):
+        """Patches get_access_token so calls to it can be counted"""
+        return patch.object(
+            conjur.api.AuthenticationApi,
+            'get_access_token',
+            autospec=True,
+            side_effect=conjur.api.AuthenticationApi.get_access_token
+        )
+
+    def test_token_fetched_on_first_request(self):
+        """Test a client with a token provider authenticates without an api_key set"""
+        with self.count_authentications() as mock:
+            secret = self.api.get_secret(self.account, 'variable', TEST_VARIABLE)
+            self.api.get_secret(self.account, 'variable', TEST_VARIABLE)
+
+        self.assertEqual(secret, 'provider secret')
+        self.assertEqual(mock.call_count, 1)
+
+    def test_concurrent_refresh_authenticates_once(self):
+        """Test threads needing a new token at the same time share one authenticate request"""
+        header = self.provider.header()
+
+        def refresh():
+            self.provider.invalidate(header)
+
+        with self.count_authentications() as mock:
+            threads = [threading.Thread(target=refresh) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(mock.call_count, 1)
+
+    def test_rejected_token_retried_once(self):
+        """Test a 401 response replaces the token and retries the request"""
+        self.provider.token()
+        # pylint: disable=protected-access
+        self.provider._token = 'expired'
+
+        with self.count_authentications() as mock:
+            secret = self.api.get_secret(self.account, 'variable', TEST_VARIABLE)
+
+        self.assertEqual(secret, 'provider secret')
+        self.assertEqual(mock.call_count, 1)
+
+    def test_bad_api_key_401(self):
+        """Test a provider with a bad API key raises the authenticate 401 response"""
+        provider = conjur.AccessTokenProvider(self.account, 'admin', 'bad_api_key')
+        client = conjur.ApiClient(api_config.get_api_config(), token_provider=provider)
+
+        with self.assertRaises(conjur.ApiException) as context:
+            conjur.api.SecretsApi(client).get_secret(self.account, 'variable', TEST_VARIABLE)
+
+        self.assertEqual(context.exception.status, 401)
+        client.close()
+
+if __name__ == '__main__':
+    unittest.main()
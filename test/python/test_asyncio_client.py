@@ -0,0 +1,117 @@
+from __future__ import absolute_import
+
+import asyncio
+import os
+import socket
+import unittest
+
+from mock_conjur import MockConjur
+
+try:
+    # generated with `bin/generate_client -l python -L asyncio -p conjur_asyncio`,
+    # which bin/test_integration runs before building the test image. It
+    # requires aiohttp.
+    import aiohttp
+    import conjur_asyncio
+except ImportError:
+    conjur_asyncio = None
+
+HTTPS_CONFIG = os.path.join(os.path.dirname(__file__), '..', '..', 'config', 'https')
+
+MOCK_POLICY = """
+- !variable db/password
+"""
+
+
+@unittest.skipIf(conjur_asyncio is None, 'The asyncio client has not been generated')
+class TestAsyncioClient(unittest.IsolatedAsyncioTestCase):
+    """Tests for the client generated with the asyncio library, awaited against the
+    Conjur mock in test/mock_conjur served over HTTPS. The mock's certificate names
+    localhost, not the address it is reached at"""
+    def setUp(self):
+        self.mock = MockConjur(
+            certfile=os.path.join(HTTPS_CONFIG, 'conjur.crt'),
+            keyfile=os.path.join(HTTPS_CONFIG, 'conjur.key')
+        ).start()
+        self.addCleanup(self.mock.stop)
+        self.mock.load_policy(MOCK_POLICY)
+        # created outside a running event loop, where no aiohttp session can be
+        self.client = self.new_client(assert_hostname='localhost')
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def new_client(self, **settings):
+        config = conjur_asyncio.Configuration(host=self.mock.url)
+        config.ssl_ca_cert = os.path.join(HTTPS_CONFIG, 'ca.crt')
+        for name, value in settings.items():
+            setattr(config, name, value)
+        return conjur_asyncio.ApiClient(config)
+
+    async def login(self, client):
+        token = await conjur_asyncio.AuthenticationApi(client).get_access_token(
+            self.mock.account,
+            'admin',
+            body=self.mock.admin_api_key,
+            accept_encoding='base64'
+        )
+        client.configuration.api_key = {'Authorization': f'Token token="{token}"'}
+        return conjur_asyncio.SecretsApi(client)
+
+    async def test_awaited_calls(self):
+        """Test secrets are written and read through awaited calls, with the session
+        created on the first request inside the event loop"""
+        self.assertIsNone(self.client.rest_client._pool_manager)
+
+        api = await self.login(self.client)
+        await api.create_secret(self.mock.account, 'variable', 'db/password', body='awaited')
+        secrets = await asyncio.gather(*[
+            api.get_secret(self.mock.account, 'variable', 'db/password') for _ in range(5)
+        ])
+
+        self.assertEqual(secrets, ['awaited'] * 5)
+        self.assertIsInstance(self.client.rest_client._pool_manager, aiohttp.ClientSession)
+
+    async def test_assert_hostname(self):
+        """Test the certificate is checked against assert_hostname rather than the host
+        of the url, and not at all when it is False"""
+        client = self.new_client()
+        with self.assertRaises(conjur_asyncio.ApiException) as context:
+            await self.login(client)
+        await client.close()
+        self.assertEqual(context.exception.status, 0)
+
+        client = self.new_client(assert_hostname=False)
+        api = await self.login(client)
+        await client.close()
+        self.assertIsInstance(api, conjur_asyncio.SecretsApi)
+
+    async def test_proxy(self):
+        """Test requests are sent through the configured proxy"""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        client = self.new_client(assert_hostname='localhost',
+                                 proxy=f'http://127.0.0.1:{port}')
+
+        with self.assertRaises(aiohttp.ClientProxyConnectionError):
+            await self.login(client)
+        await client.close()
+
+    async def test_request_timeout(self):
+        """Test a number is a total timeout and a pair the connect and read timeouts"""
+        api = await self.login(self.client)
+        await api.create_secret(self.mock.account, 'variable', 'db/password', body='slow')
+        self.mock.set_fault('getSecret', latency=0.5)
+
+        for timeout in (0.1, (5, 0.1)):
+            with self.assertRaises(asyncio.TimeoutError):
+                await api.get_secret(self.mock.account, 'variable', 'db/password',
+                                     _request_timeout=timeout)
+
+        secret = await api.get_secret(self.mock.account, 'variable', 'db/password',
+                                      _request_timeout=(5, 5))
+        self.assertEqual(secret, 'slow')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+from __future__ import absolute_import
+
+import unittest
+
+import conjur
+
+from . import api_config
+
+BATCH_VARIABLES = [f"batch/var-{i}" for i in range(20)]
+
+BATCH_POLICY = "\n".join(f"- !variable {i}" for i in BATCH_VARIABLES)
+
+
+class TestBatchSecretsRetriever(api_config.ConfiguredTest):
+    """BatchSecretsRetriever integration tests"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        conjur.api.PoliciesApi(cls.client).update_policy(cls.account, 'root', BATCH_POLICY)
+        secrets_api = conjur.api.SecretsApi(cls.client)
+        for variable in BATCH_VARIABLES:
+            secrets_api.create_secret(cls.account, "variable", variable, body=f"{variable} value")
+
+    def setUp(self):
+        self.variable_ids = [f"{self.account}:variable:{i}" for i in BATCH_VARIABLES]
+        self.expected = {i: f"{i.split(':')[2]} value" for i in self.variable_ids}
+
+    def test_retrieve_single_request(self):
+        """Test ids fitting in one url are fetched with a single request"""
+        retriever = conjur.BatchSecretsRetriever(self.client)
+
+        values = retriever.retrieve(self.variable_ids)
+
+        self.assertEqual(values, self.expected)
+        self.assertEqual(retriever.request_count, 1)
+        self.assertEqual(retriever.missing, [])
+
+    def test_retrieve_chunked(self):
+        """Test long id lists are split so every url fits in max_url_length"""
+        retriever = conjur.BatchSecretsRetriever(self.client, max_url_length=200)
+        chunks = retriever.chunks(self.variable_ids)
+
+        values = retriever.retrieve(self.variable_ids)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(self.variable_ids))
+        self.assertEqual(values, self.expected)
+        self.assertEqual(retriever.request_count, len(chunks))
+
+    def test_retrieve_missing_variables(self):
+        """Test a 404 chunk is bisected so the other values are still returned"""
+        missing = [f"{self.account}:variable:nonexist-{i}" for i in range(2)]
+        retriever = conjur.BatchSecretsRetriever(self.client)
+
+        values = retriever.retrieve(self.variable_ids + missing)
+
+        self.assertEqual(values, self.expected)
+        self.assertEqual(sorted(retriever.missing), missing)
+
+    def test_retrieve_401(self):
+        """Test errors other than 404 are raised"""
+        retriever = conjur.BatchSecretsRetriever(self.bad_auth_client)
+
+        with self.assertRaises(conjur.exceptions.ApiException) as context:
+            retriever.retrieve(self.variable_ids)
+
+        self.assertEqual(context.exception.status, 401)
+
+    def test_id_too_long(self):
+        """Test an id which can never fit in a url is rejected"""
+        retriever = conjur.BatchSecretsRetriever(self.client, max_url_length=50)
+
+        with self.assertRaises(conjur.exceptions.ApiValueError):
+            retriever.retrieve(self.variable_ids)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+from __future__ import absolute_import
+
+import time
+import unittest
+from unittest.mock import patch
+
+import conjur
+import urllib3
+
+from . import api_config
+
+TEST_VARIABLE = "one/password"
+
+
+class TestCircuitBreaker(api_config.ConfiguredTest):
+    """CircuitBreaker integration tests. Failures are injected in front of the
+    connection pool, and requests let through the breaker reach Conjur"""
+    def setUp(self):
+        self.breaker = conjur.CircuitBreaker(window_size=4, min_calls=4,
+                                             reset_timeout=0.2)
+        self.changes = []
+        self.breaker.add_listener(lambda *change: self.changes.append(change))
+
+        config = api_config.get_api_config()
+        config.circuit_breaker = self.breaker
+        config.api_key = self.client.configuration.api_key
+        self.breaker_client = conjur.ApiClient(config)
+        self.api = conjur.api.SecretsApi(self.breaker_client)
+        conjur.api.SecretsApi(self.client).create_secret(
+            self.account, "variable", TEST_VARIABLE, body="breaker")
+        self.host = urllib3.util.parse_url(config.host).netloc
+
+    def fail_requests(self, error=None):
+        """Fails every request sent with `error`, or a 503 response"""
+        def request(*args, **kwargs):
+            if error is not None:
+                raise error
+            return urllib3.HTTPResponse(body=b'unavailable', status=503)
+
+        return patch.object(self.breaker_client.rest_client.pool_manager,
+                            'request', side_effect=request)
+
+    def get_secret(self):
+        return self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+    def trip(self):
+        with self.fail_requests():
+            for _ in range(4):
+                with self.assertRaises(conjur.ApiException):
+                    self.get_secret()
+
+    def test_trips_on_failures(self):
+        """Test the circuit opens once the failure rate is reached, and then
+        fails requests without sending them"""
+        self.trip()
+        self.assertEqual(self.breaker.state(self.host), 'open')
+        self.assertEqual(self.changes, [(self.host, 'closed', 'open')])
+
+        with patch.object(self.breaker_client.rest_client.pool_manager, 'request') as mock:
+            with self.assertRaises(conjur.CircuitOpenError) as context:
+                self.get_secret()
+
+        mock.assert_not_called()
+        self.assertEqual(context.exception.status, 0)
+        self.assertEqual(self.breaker.stats()[self.host]['rejected'], 1)
+
+    def test_connection_errors_trip(self):
+        """Test requests getting no response count as failures"""
+        error = urllib3.exceptions.MaxRetryError(None, '/', 'connection refused')
+        with self.fail_requests(error):
+            for _ in range(4):
+                with self.assertRaises(urllib3.exceptions.MaxRetryError):
+                    self.get_secret()
+
+        self.assertEqual(self.breaker.state(self.host), 'open')
+
+    def test_client_errors_do_not_trip(self):
+        """Test 404 responses mean the server is up"""
+        for _ in range(5):
+            with self.assertRaises(conjur.ApiException) as context:
+                self.api.get_secret(self.account, "variable", "badname")
+            self.assertEqual(context.exception.status, 404)
+
+        self.assertEqual(self.breaker.state(self.host), 'closed')
+
+    def test_half_open_probe(self):
+        """Test a successful probe closes the circuit, and a failed one opens
+        it again"""
+        self.trip()
+        time.sleep(0.25)
+        with self.fail_requests():
+            with self.assertRaises(conjur.ApiException):
+                self.get_secret()
+        self.assertEqual(self.breaker.state(self.host), 'open')
+
+        time.sleep(0.25)
+        self.assertEqual(self.get_secret(), "breaker")
+        self.assertEqual(self.breaker.state(self.host), 'closed')
+        self.assertEqual(self.changes, [
+            (self.host, 'closed', 'open'),
+            (self.host, 'open', 'half_open'),
+            (self.host, 'half_open', 'open'),
+            (self.host, 'open', 'half_open'),
+            (self.host, 'half_open', 'closed'),
+        ])
+
+    def test_trips_on_latency(self):
+        """Test the circuit opens when requests become slow"""
+        self.breaker.slow_call_duration = 0.05
+        send = self.breaker_client.rest_client.pool_manager.request
+
+        def slow_request(*args, **kwargs):
+            time.sleep(0.06)
+            return send(*args, **kwargs)
+
+        with patch.object(self.breaker_client.rest_client.pool_manager, 'request',
+                          side_effect=slow_request):
+            for _ in range(4):
+                self.get_secret()
+
+        self.assertEqual(self.breaker.state(self.host), 'open')
+
+    def test_not_retried_while_open(self):
+        """Test a RetryPolicy does not retry requests refused by the breaker"""
+        self.trip()
+        self.breaker_client.rest_client.retry_policy = conjur.RetryPolicy(base_delay=0.01)
+
+        with self.assertRaises(conjur.CircuitOpenError) as context:
+            self.get_secret()
+        self.assertEqual(context.exception.attempts, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+from __future__ import absolute_import
+
+import logging
+import unittest
+from urllib.parse import quote
+
+import conjur
+
+from . import api_config
+
+TEST_VARIABLE = "one/password"
+
+
+class TestClientMetrics(api_config.ConfiguredTest):
+    """ClientMetrics integration tests"""
+    def setUp(self):
+        self.metrics = conjur.ClientMetrics()
+        config = api_config.get_api_config()
+        config.metrics = self.metrics
+        config.api_key = self.client.configuration.api_key
+        self.metrics_client = conjur.ApiClient(config)
+        self.api = conjur.api.SecretsApi(self.metrics_client)
+
+    def stats(self, operation, status):
+        for stats in self.metrics.snapshot():
+            if stats['operation'] == operation and stats['status'] == status:
+                return stats
+        self.fail("no calls to {0} with status {1}".format(operation, status))
+
+    def test_operations_and_statuses(self):
+        """Test calls are recorded by operationId and status"""
+        self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="measured")
+        for _ in range(3):
+            self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+        with self.assertRaises(conjur.ApiException):
+            self.api.get_secret(self.account, "variable", "badname")
+
+        created = self.stats('createSecret', 201)
+        self.assertEqual(created['count'], 1)
+        self.assertEqual(created['bytes_sent'], len("measured"))
+
+        read = self.stats('getSecret', 200)
+        self.assertEqual(read['count'], 3)
+        self.assertEqual(read['bytes_received'], 3 * len("measured"))
+        self.assertGreater(read['sum'], 0)
+        self.assertLessEqual(read['p50'], read['p99'])
+        self.assertLessEqual(read['p99'], read['max'])
+
+        self.assertEqual(self.stats('getSecret', 404)['count'], 1)
+
+    def test_connection_errors(self):
+        """Test calls getting no response are recorded with status 0"""
+        config = api_config.get_api_config()
+        config.host = "https://localhost:1"
+        config.metrics = self.metrics
+        config.retries = False
+        api = conjur.api.SecretsApi(conjur.ApiClient(config))
+        with self.assertRaises(Exception):
+            api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        self.assertEqual(self.stats('getSecret', 0)['count'], 1)
+
+    def test_nested_calls(self):
+        """Test a call made while another is in progress, like a token refresh, leaves
+        the outer call measuring the requests sent after it"""
+        self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="measured")
+        configuration = self.metrics_client.configuration
+        outer = self.metrics.begin('outer')
+        self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+        self.metrics_client.rest_client.GET(
+            f"{configuration.host}/secrets/{self.account}/variable/{quote(TEST_VARIABLE, safe='')}",
+            headers=dict(configuration.api_key))
+        outer.end(200)
+
+        self.assertEqual(self.stats('getSecret', 200)['bytes_received'], len("measured"))
+        self.assertEqual(self.stats('outer', 200)['bytes_received'], len("measured"))
+
+    def test_nested_calls_to_an_operation(self):
+        """Test a call begun while another to the same operation is in progress on the
+        thread is measured on its own"""
+        outer = self.metrics.begin('operation')
+        inner = self.metrics.begin('operation')
+        inner.end(404)
+        outer.end(200)
+        self.metrics.begin('operation').end(200)
+
+        self.assertEqual(self.stats('operation', 200)['count'], 2)
+        self.assertEqual(self.stats('operation', 404)['count'], 1)
+        self.assertGreaterEqual(self.stats('operation', 200)['max'],
+                                self.stats('operation', 404)['max'])
+
+    def test_hedged_calls(self):
+        """Test requests sent from a HedgingPolicy's threads are measured"""
+        hedging = conjur.HedgingPolicy(min_samples=5)
+        self.addCleanup(hedging.close)
+        config = api_config.get_api_config()
+        config.metrics = self.metrics
+        config.hedging = hedging
+        config.api_key = self.client.configuration.api_key
+        api = conjur.api.SecretsApi(conjur.ApiClient(config))
+        api.create_secret(self.account, "variable", TEST_VARIABLE, body="measured")
+        for _ in range(10):
+            api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        self.assertTrue(hedging.stats()['delays'])
+        self.assertEqual(self.stats('getSecret', 200)['bytes_received'], 10 * len("measured"))
+
+    def test_prometheus(self):
+        """Test the statistics are exported in the Prometheus text format"""
+        self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="measured")
+        self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+        text = self.metrics.prometheus()
+
+        labels = 'operation="getSecret",status="200"'
+        self.assertIn('# TYPE conjur_client_request_duration_seconds histogram', text)
+        self.assertIn(
+            'conjur_client_request_duration_seconds_bucket{%s,le="+Inf"} 1' % labels, text)
+        self.assertIn('conjur_client_request_duration_seconds_count{%s} 1' % labels, text)
+        self.assertIn(
+            'conjur_client_bytes_total{%s,direction="received"} 8' % labels, text)
+
+    def test_exporter(self):
+        """Test the exporter callback is given snapshots"""
+        snapshots = []
+        self.metrics.exporter = snapshots.append
+        self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="measured")
+        self.api.get_secrets(variable_ids=f'{self.account}:variable:{TEST_VARIABLE}')
+        self.metrics.export()
+
+        self.assertEqual([stats['operation'] for stats in snapshots[0]],
+                         ['createSecret', 'getSecrets'])
+
+    def test_response_body_not_logged(self):
+        """Test debug logs hold the size of responses but not their body"""
+        self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="not-logged")
+        with self.assertLogs('conjur.rest', level=logging.DEBUG) as logs:
+            self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        self.assertNotIn("not-logged", "\n".join(logs.output))
+        self.assertIn("10 bytes", "\n".join(logs.output))
+
+if __name__ == '__main__':
+    unittest.main()
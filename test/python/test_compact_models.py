@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+
+import copy
+import json
+import pickle
+import unittest
+from collections import namedtuple
+
+import conjur
+
+Response = namedtuple('Response', 'data')
+
+RESOURCE = {
+    'created_at': '2021-03-23T16:37:14.455+00:00',
+    'id': 'dev:variable:db/password',
+    'owner': 'dev:user:admin',
+    'permissions': [{'privilege': 'read', 'role': 'dev:user:alice', 'policy': 'dev:policy:root'}],
+    'policy': 'dev:policy:root',
+    'annotations': [{'name': 'description', 'value': 'Database', 'policy': 'dev:policy:root'}],
+    'secrets': [{'version': 1}],
+}
+
+
+@unittest.skipUnless(hasattr(conjur.models.Resource, '_from_openapi_data'),
+                     'The client was generated without the compactModels option')
+class TestCompactModels(unittest.TestCase):
+    """Tests for the models generated with the compactModels option, which hold their
+    attributes in __slots__ and share the configuration of the client reading them.
+    These tests need no Conjur deployment"""
+    def setUp(self):
+        self.client = conjur.ApiClient(conjur.Configuration(host='http://localhost'))
+
+    def tearDown(self):
+        self.client.close()
+
+    def read(self, data, response_type):
+        return self.client.deserialize(Response(json.dumps(data).encode('utf-8')),
+                                       response_type)
+
+    def test_attributes_decoded(self):
+        """Attributes are decoded to their types when the response is read"""
+        resource = self.read(RESOURCE, 'Resource')
+
+        self.assertIsInstance(resource.annotations[0], conjur.models.PolicyAnnotation)
+        self.assertEqual(resource.annotations[0].value, 'Database')
+        self.assertEqual(resource.id, RESOURCE['id'])
+        self.assertIsNone(resource.restricted_to)
+        self.assertFalse(hasattr(resource, '__dict__'))
+        self.assertIs(resource.local_vars_configuration, self.client.configuration)
+
+    def test_malformed_response_raises(self):
+        """Validation errors of a malformed response are raised when it is read, as
+        with the stock models"""
+        with self.assertRaises(ValueError):
+            self.read({'error': 'not found'}, 'AuthenticatorStatus')
+
+    def test_pickle_and_copy(self):
+        """Pickled and copied models hold the decoded attributes"""
+        resource = self.read(RESOURCE, 'Resource')
+        expected = self.read(RESOURCE, 'Resource').to_dict()
+
+        for other in (pickle.loads(pickle.dumps(resource)), copy.copy(resource),
+                      copy.deepcopy(resource)):
+            self.assertEqual(other.to_dict(), expected)
+            self.assertEqual(other, resource)
+
+    def test_same_as_constructed_model(self):
+        """Models read from a response equal those built through their constructor,
+        as the stock models are"""
+        resource = self.read(RESOURCE, 'Resource')
+        annotation = RESOURCE['annotations'][0]
+        constructed = conjur.models.Resource(
+            created_at=RESOURCE['created_at'],
+            id=RESOURCE['id'],
+            owner=RESOURCE['owner'],
+            permissions=RESOURCE['permissions'],
+            policy=RESOURCE['policy'],
+            annotations=[conjur.models.PolicyAnnotation(**annotation)],
+            secrets=RESOURCE['secrets'],
+        )
+
+        self.assertEqual(resource.to_dict(), constructed.to_dict())
+        self.assertEqual(resource, constructed)
+
+if __name__ == '__main__':
+    unittest.main()
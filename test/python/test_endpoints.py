@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+
+import unittest
+from unittest.mock import patch
+
+import conjur
+import urllib3
+
+from . import api_config
+
+TEST_VARIABLE = "one/password"
+# nothing listens on this port, so requests to it get no response
+DOWN_FOLLOWER = "https://localhost:1"
+
+
+class TestEndpoints(api_config.ConfiguredTest):
+    """Endpoints integration tests. The test environment has a single Conjur
+    server, which plays the leader, while followers are either the same server
+    or an address nothing listens on"""
+    def setUp(self):
+        config = api_config.get_api_config()
+        self.leader = config.host
+        self.endpoints = conjur.Endpoints(
+            self.leader, followers=[DOWN_FOLLOWER, self.leader],
+            health_check_interval=None)
+        config.endpoints = self.endpoints
+        config.api_key = self.client.configuration.api_key
+        config.retries = False
+        self.endpoints_client = conjur.ApiClient(config)
+        self.api = conjur.api.SecretsApi(self.endpoints_client)
+        conjur.api.SecretsApi(self.client).create_secret(
+            self.account, "variable", TEST_VARIABLE, body="endpoints")
+
+    def record_urls(self):
+        pool_manager = self.endpoints_client.rest_client.pool_manager
+        return patch.object(pool_manager, 'request', wraps=pool_manager.request)
+
+    def sent_to(self, mock):
+        return [urllib3.util.parse_url(call[0][1]).netloc for call in mock.call_args_list]
+
+    def test_read_fails_over(self):
+        """Test a read sent to an unavailable follower is sent to the next server,
+        and the follower is ejected"""
+        # untried followers come first, so make the healthy one look slow
+        self.endpoints.followers[1].latency = 10
+
+        with self.record_urls() as mock:
+            self.assertEqual(
+                self.api.get_secret(self.account, "variable", TEST_VARIABLE), "endpoints")
+            self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        self.assertEqual(self.sent_to(mock), ['localhost:1'] + [
+            urllib3.util.parse_url(self.leader).netloc] * 2)
+        stats = self.endpoints.stats()
+        self.assertFalse(stats[1]['healthy'])
+        self.assertEqual(stats[1]['failures'], 1)
+        self.assertIsNotNone(stats[2]['latency'])
+
+    def test_writes_pinned_to_leader(self):
+        """Test writes are only sent to the leader"""
+        self.endpoints.followers.pop(1)
+        with self.record_urls() as mock:
+            self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="leader")
+
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(self.endpoints.stats()[0]['requests'], 1)
+        self.assertTrue(self.endpoints.stats()[1]['healthy'])
+
+    def test_health_checks(self):
+        """Test health checks eject servers failing /health, and restore those
+        passing it"""
+        self.endpoints.followers[1].healthy = False
+        self.endpoints_client.rest_client.check_health()
+
+        healthy = [endpoint['healthy'] for endpoint in self.endpoints.stats()]
+        self.assertEqual(healthy, [True, False, True])
+
+        with self.record_urls() as mock:
+            self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+        self.assertEqual(mock.call_count, 1)
+
+    def test_client_errors_not_failed_over(self):
+        """Test errors from an available server are raised without trying others"""
+        self.endpoints.followers.pop(0)
+        with self.record_urls() as mock:
+            with self.assertRaises(conjur.ApiException) as context:
+                self.api.get_secret(self.account, "variable", "badname")
+
+        self.assertEqual(context.exception.status, 404)
+        self.assertEqual(mock.call_count, 1)
+        self.assertTrue(self.endpoints.stats()[1]['healthy'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+
+import time
+import unittest
+from multiprocessing.pool import ThreadPool
+from unittest.mock import patch
+
+import conjur
+
+from . import api_config
+
+TEST_VARIABLE = "one/password"
+
+
+class TestHedgingPolicy(api_config.ConfiguredTest):
+    """HedgingPolicy integration tests. A delay is injected in front of the
+    connection pool for the first request sent, so its hedge answers first.
+    Local reads answer well within the least hedging delay of 0.2s, so that
+    is the delay used"""
+    def setUp(self):
+        self.hedging = conjur.HedgingPolicy(min_delay=0.2, min_samples=5)
+        config = api_config.get_api_config()
+        config.hedging = self.hedging
+        config.api_key = self.client.configuration.api_key
+        self.hedging_client = conjur.ApiClient(config)
+        self.api = conjur.api.SecretsApi(self.hedging_client)
+        conjur.api.SecretsApi(self.client).create_secret(
+            self.account, "variable", TEST_VARIABLE, body="hedged")
+
+        # enough response times to know when to hedge
+        for _ in range(5):
+            self.get_secret()
+
+    def tearDown(self):
+        self.hedging.close()
+
+    def get_secret(self):
+        return self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+    def slow_first_request(self, delay=0.5):
+        pool_manager = self.hedging_client.rest_client.pool_manager
+        send = pool_manager.request
+        sent = []
+
+        def request(*args, **kwargs):
+            sent.append(args)
+            if len(sent) == 1:
+                time.sleep(delay)
+            return send(*args, **kwargs)
+
+        return patch.object(pool_manager, 'request', side_effect=request)
+
+    def test_slow_read_hedged(self):
+        """Test the hedge of a slow read answers first"""
+        start = time.time()
+        with self.slow_first_request() as mock:
+            self.assertEqual(self.get_secret(), "hedged")
+
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(mock.call_count, 2)
+        stats = self.hedging.stats()
+        self.assertEqual(stats['hedged'], 1)
+        self.assertEqual(stats['hedge_wins'], 1)
+
+    def test_fast_read_not_hedged(self):
+        """Test reads answered within the hedging delay are sent once"""
+        pool_manager = self.hedging_client.rest_client.pool_manager
+        with patch.object(pool_manager, 'request', wraps=pool_manager.request) as mock:
+            self.get_secret()
+
+        self.assertEqual(mock.call_count, 1)
+        stats = self.hedging.stats()
+        self.assertEqual(stats['requests'], 6)
+        self.assertEqual(stats['hedged'], 0)
+        self.assertEqual(set(stats['delays'].values()), {0.2})
+
+    def test_concurrent_reads_not_hedged(self):
+        """Test more concurrent reads than idle threads are all sent at once,
+        so none waits long enough to be hedged"""
+        self.hedging.pool_threads = 1
+        pool_manager = self.hedging_client.rest_client.pool_manager
+        send = pool_manager.request
+
+        def request(*args, **kwargs):
+            time.sleep(0.1)
+            return send(*args, **kwargs)
+
+        with patch.object(pool_manager, 'request', side_effect=request), \
+                ThreadPool(8) as pool:
+            pool.map(lambda _: self.get_secret(), range(8))
+
+        self.assertEqual(self.hedging.stats()['hedged'], 0)
+
+    def test_writes_not_hedged(self):
+        """Test slow writes are never sent twice"""
+        with self.slow_first_request(0.2) as mock:
+            self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="hedged")
+
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(self.hedging.stats()['hedged'], 0)
+
+    def test_extra_load_budget(self):
+        """Test no hedges are sent once the budget is spent"""
+        self.hedging.budget_burst = 0
+        with self.slow_first_request(0.2) as mock:
+            self.assertEqual(self.get_secret(), "hedged")
+
+        self.assertEqual(mock.call_count, 1)
+        stats = self.hedging.stats()
+        self.assertEqual(stats['hedged'], 0)
+        self.assertEqual(stats['budget_exhausted'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
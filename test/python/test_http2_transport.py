@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import socket
+import unittest
+from multiprocessing.pool import ThreadPool
+
+import conjur
+import urllib3
+
+from . import api_config
+
+TEST_VARIABLES = ["one/password", "testSecret"]
+
+
+class TestHttp2Transport(api_config.ConfiguredTest):
+    """Tests the http2 transport against the HTTPS front end of Conjur"""
+    def setUp(self):
+        config = api_config.get_api_config()
+        config.transport = 'http2'
+        config.api_key = self.client.configuration.api_key
+        self.http2_client = conjur.ApiClient(config)
+        self.api = conjur.api.SecretsApi(self.http2_client)
+        for secret in TEST_VARIABLES:
+            self.api.create_secret(self.account, "variable", secret, body=f"{secret} value")
+
+    def tearDown(self):
+        self.http2_client.close()
+        self.http2_client.rest_client.pool_manager.clear()
+
+    def test_get_secret(self):
+        """Test requests and responses go through the http2 transport"""
+        response = self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+
+        self.assertEqual(response, "one/password value")
+
+    def test_http2_negotiated(self):
+        """Test the HTTPS front end is spoken to over HTTP/2"""
+        response = self.api.get_secret(
+            self.account,
+            "variable",
+            TEST_VARIABLES[0],
+            _preload_content=False
+        )
+
+        self.assertEqual(response.httpx_response.http_version, 'HTTP/2')
+        self.assertEqual(response.data, b"one/password value")
+
+    def test_concurrent_requests(self):
+        """Test concurrent requests made through one client"""
+        variables = TEST_VARIABLES * 10
+
+        with ThreadPool(8) as pool:
+            responses = pool.map(
+                lambda i: self.api.get_secret(self.account, "variable", i),
+                variables
+            )
+
+        self.assertEqual(responses, [f"{i} value" for i in variables])
+
+    def test_error_response(self):
+        """Test error responses are raised as ApiExceptions"""
+        with self.assertRaises(conjur.exceptions.ApiException) as context:
+            self.api.get_secret(self.account, "variable", "badname")
+
+        self.assertEqual(context.exception.status, 404)
+
+    def test_connection_refused(self):
+        """Test refused connections are raised as urllib3 errors, so they are retried
+        and trip the circuit breaker"""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        policy = conjur.RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.02)
+        breaker = conjur.CircuitBreaker(window_size=3, min_calls=3)
+        config = api_config.get_api_config()
+        config.host = f'https://127.0.0.1:{port}'
+        config.transport = 'http2'
+        config.retry_policy = policy
+        config.circuit_breaker = breaker
+        client = conjur.ApiClient(config)
+        self.addCleanup(client.close)
+
+        with self.assertRaises(urllib3.exceptions.NewConnectionError) as context:
+            conjur.api.SecretsApi(client).get_secret(self.account, "variable", TEST_VARIABLES[0])
+
+        self.assertEqual(context.exception.attempts, 3)
+        self.assertEqual(policy.stats()['retries'], 2)
+        self.assertEqual(breaker.state(f'127.0.0.1:{port}'), conjur.CircuitBreaker.OPEN)
+
+    def test_unknown_transport(self):
+        """Test transports other than urllib3 and http2 are rejected"""
+        config = api_config.get_api_config()
+        config.transport = 'http3'
+
+        with self.assertRaises(conjur.exceptions.ApiValueError):
+            conjur.ApiClient(config)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+from __future__ import absolute_import
+
+import json
+import unittest
+
+import conjur
+
+from . import api_config
+
+TEST_VARIABLES = ["one/password", "testSecret"]
+
+
+class TestJsonCodec(api_config.ConfiguredTest):
+    """JsonCodec integration tests"""
+    def setUp(self):
+        secrets_api = conjur.api.SecretsApi(self.client)
+        for variable in TEST_VARIABLES:
+            secrets_api.create_secret(self.account, "variable", variable,
+                                      body=f"{variable} value")
+        self.variable_ids = ','.join(f"{self.account}:variable:{i}" for i in TEST_VARIABLES)
+
+    def codec_client(self, codec):
+        config = api_config.get_api_config()
+        config.json_codec = codec
+        config.api_key = self.client.configuration.api_key
+        client = conjur.ApiClient(config)
+        self.addCleanup(client.close)
+        return client
+
+    def test_fastest_codec_default(self):
+        """Test clients use orjson, installed with the test requirements, by default"""
+        self.assertIsInstance(self.client.json_codec, conjur.OrjsonCodec)
+
+    def test_codecs_decode_alike(self):
+        """Test listings and batch secrets decode to the same values with each codec"""
+        results = []
+        for codec in ('json', 'orjson', conjur.OrjsonCodec()):
+            client = self.codec_client(codec)
+            results.append((
+                conjur.api.SecretsApi(client).get_secrets(variable_ids=self.variable_ids),
+                conjur.api.ResourcesApi(client).show_resources_for_account(self.account),
+            ))
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+    def test_text_response(self):
+        """Test bodies which are not JSON are returned as text"""
+        api = conjur.api.SecretsApi(self.codec_client('orjson'))
+        api.create_secret(self.account, "variable", TEST_VARIABLES[0], body="not {json")
+
+        secret = api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+
+        self.assertEqual(secret, "not {json")
+
+    def test_last_response_text(self):
+        """Test the body of the last response is read as text, and only decoded from
+        bytes when it is read"""
+        client = self.codec_client('orjson')
+        conjur.api.SecretsApi(client).get_secrets(variable_ids=self.variable_ids)
+
+        self.assertIsInstance(client.last_response._data, bytes)
+        self.assertIsInstance(client.last_response.data, str)
+        self.assertEqual(json.loads(client.last_response.data)[f"{self.account}:variable:testSecret"],
+                         "testSecret value")
+
+    def test_unknown_codec(self):
+        """Test codecs which do not exist are rejected"""
+        with self.assertRaises(conjur.ApiValueError):
+            self.codec_client('simdjson')
+
+
+class TestJsonCodecEncoding(unittest.TestCase):
+    """JsonCodec tests which need no Conjur deployment"""
+    def test_dumps(self):
+        """Test every codec encodes request bodies as UTF-8 JSON bytes"""
+        body = {'id': 'myorg:variable:db/pässword', 'count': 2}
+        for codec in (conjur.JsonCodec(), conjur.OrjsonCodec()):
+            encoded = codec.dumps(body)
+
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(encoded.decode('utf-8')), body)
+
+if __name__ == '__main__':
+    unittest.main()
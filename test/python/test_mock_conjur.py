@@ -0,0 +1,243 @@
+from __future__ import absolute_import
+
+import datetime
+import time
+import unittest
+
+import conjur
+from mock_conjur import MockConjur
+
+MOCK_POLICY = """
+- !user alice
+- !variable db/password
+- !variable db/username
+
+- !policy
+  id: apps
+  body:
+  - !layer
+  - !variable token
+  - !host-factory
+    id: factory
+    layers: [ !layer ]
+
+- !group readers
+- !grant
+  role: !group readers
+  member: !user alice
+"""
+
+READ_POLICY = """
+- !permit
+  role: !group readers
+  privileges: [ read ]
+  resource: !variable db/password
+"""
+
+EXECUTE_POLICY = """
+- !permit
+  role: !group readers
+  privileges: [ execute ]
+  resource: !variable db/password
+"""
+
+
+class TestMockConjur(unittest.TestCase):
+    """Tests for the stateful Conjur mock in test/mock_conjur. The mock runs in
+    the test process and is exercised through the generated client, so these
+    tests need no Conjur deployment"""
+    def setUp(self):
+        self.mock = MockConjur(seed=1).start()
+        loaded = self.mock.load_policy(MOCK_POLICY)
+        self.alice_api_key = loaded['created_roles'][f'{self.mock.account}:user:alice']['api_key']
+        self.client = self.login('admin', self.mock.admin_api_key)
+
+    def tearDown(self):
+        self.client.close()
+        self.mock.stop()
+
+    def login(self, login, api_key):
+        """Returns a client authenticated against the mock. urllib3 retries are
+        off, they would hide the injected failures"""
+        config = conjur.Configuration(host=self.mock.url)
+        config.retries = False
+        client = conjur.ApiClient(config)
+        token = conjur.AuthenticationApi(client).get_access_token(
+            self.mock.account,
+            login,
+            body=api_key,
+            accept_encoding='base64'
+        )
+        config.api_key = {'Authorization': f'Token token="{token}"'}
+        return client
+
+    def test_secret_versions(self):
+        """Secrets keep their earlier versions"""
+        api = conjur.SecretsApi(self.client)
+        api.create_secret(self.mock.account, 'variable', 'db/password', body='first')
+        api.create_secret(self.mock.account, 'variable', 'db/password', body='second')
+
+        self.assertEqual(api.get_secret(self.mock.account, 'variable', 'db/password'), 'second')
+        self.assertEqual(
+            api.get_secret(self.mock.account, 'variable', 'db/password', version=1),
+            'first'
+        )
+        variable = f'{self.mock.account}:variable:db/password'
+        self.assertEqual(api.get_secrets(variable), {variable: 'second'})
+
+    def test_missing_secret_404(self):
+        """Variables without a value and unknown variables are not found"""
+        api = conjur.SecretsApi(self.client)
+        for identifier in ('db/username', 'db/nonexistent'):
+            with self.assertRaises(conjur.ApiException) as context:
+                api.get_secret(self.mock.account, 'variable', identifier)
+            self.assertEqual(context.exception.status, 404)
+
+    def test_privileges(self):
+        """Hidden resources are not found, visible ones without the privilege
+        are forbidden"""
+        self.mock.add_secret('db/password', 'secret')
+        alice = conjur.SecretsApi(self.login('alice', self.alice_api_key))
+        policies = conjur.PoliciesApi(self.client)
+
+        with self.assertRaises(conjur.ApiException) as context:
+            alice.get_secret(self.mock.account, 'variable', 'db/password')
+        self.assertEqual(context.exception.status, 404)
+
+        policies.update_policy(self.mock.account, 'root', READ_POLICY)
+        with self.assertRaises(conjur.ApiException) as context:
+            alice.get_secret(self.mock.account, 'variable', 'db/password')
+        self.assertEqual(context.exception.status, 403)
+
+        policies.update_policy(self.mock.account, 'root', EXECUTE_POLICY)
+        self.assertEqual(alice.get_secret(self.mock.account, 'variable', 'db/password'),
+                         'secret')
+
+    def test_replace_policy(self):
+        """Replacing a policy deletes the records it no longer declares and
+        keeps the secrets of the ones it declares again"""
+        self.mock.add_secret('db/password', 'kept')
+        api = conjur.PoliciesApi(self.client)
+        api.replace_policy(self.mock.account, 'root', '- !variable db/password')
+
+        resources = conjur.ResourcesApi(self.client).show_resources_for_kind(
+            self.mock.account, 'variable')
+        self.assertEqual([r.id for r in resources],
+                         [f'{self.mock.account}:variable:db/password'])
+        secret = conjur.SecretsApi(self.client).get_secret(
+            self.mock.account, 'variable', 'db/password')
+        self.assertEqual(secret, 'kept')
+
+    def test_invalid_policy_422(self):
+        """Statements the mock does not model are rejected"""
+        with self.assertRaises(conjur.ApiException) as context:
+            conjur.PoliciesApi(self.client).load_policy(
+                self.mock.account, 'root', '- !unknown-record x')
+        self.assertEqual(context.exception.status, 422)
+
+    def test_resources(self):
+        """Resources are filtered by kind and search, and paged"""
+        api = conjur.ResourcesApi(self.client)
+        variables = api.show_resources_for_kind(self.mock.account, 'variable')
+        self.assertEqual(len(variables), 3)
+
+        found = api.show_resources_for_kind(self.mock.account, 'variable', search='db/')
+        self.assertEqual(len(found), 2)
+        page = api.show_resources_for_kind(self.mock.account, 'variable', limit=1, offset=1)
+        self.assertEqual([r.id for r in page], [variables[1].id])
+
+    def test_role_members(self):
+        """Memberships granted in policy and through the API are listed"""
+        api = conjur.RolesApi(self.client)
+        group = api.show_role(self.mock.account, 'group', 'readers')
+        members = [member['member'] for member in group['members']]
+        self.assertIn(f'{self.mock.account}:user:alice', members)
+
+        api.add_member_to_role(self.mock.account, 'group', 'readers', members='',
+                               member=f'{self.mock.account}:user:admin')
+        memberships = api.show_role(self.mock.account, 'user', 'admin', memberships='')
+        self.assertIn(f'{self.mock.account}:group:readers', memberships)
+
+        api.remove_member_from_role(self.mock.account, 'group', 'readers', members='',
+                                    member=f'{self.mock.account}:user:admin')
+        memberships = api.show_role(self.mock.account, 'user', 'admin', memberships='')
+        self.assertNotIn(f'{self.mock.account}:group:readers', memberships)
+
+    def test_role_query_priority(self):
+        """Only the query parameter of the highest priority is answered, in the order
+        graph, all, memberships, members"""
+        api = conjur.RolesApi(self.client)
+        alice = f'{self.mock.account}:user:alice'
+        readers = f'{self.mock.account}:group:readers'
+
+        graph = api.show_role(self.mock.account, 'group', 'readers',
+                              graph='', all='', memberships='', members='')
+        self.assertIn({'parent': readers, 'child': alice}, graph)
+        for edge in graph:
+            self.assertEqual(set(edge), {'parent', 'child'})
+
+        memberships = api.show_role(self.mock.account, 'user', 'alice',
+                                    all='', memberships='', members='')
+        self.assertIn(alice, memberships)
+        self.assertIn(readers, memberships)
+
+        memberships = api.show_role(self.mock.account, 'user', 'alice',
+                                    memberships='', members='')
+        self.assertNotIn(alice, memberships)
+        self.assertIn(readers, memberships)
+
+    def test_host_factory(self):
+        """Hosts created with a host factory token can authenticate"""
+        api = conjur.HostFactoryApi(self.client)
+        expiration = datetime.date.today() + datetime.timedelta(days=1)
+        token = api.create_token(expiration, f'{self.mock.account}:host_factory:apps/factory')
+        host_client = conjur.ApiClient(conjur.Configuration(host=self.mock.url))
+        host_client.configuration.api_key = {
+            'Authorization': f'Token token="{token[0]["token"]}"'
+        }
+
+        host = conjur.HostFactoryApi(host_client).create_host('app-1')
+        host_client.close()
+        self.assertEqual(host.id, f'{self.mock.account}:host:apps/app-1')
+        self.login('host/apps/app-1', host.api_key).close()
+
+    def test_bad_token_401(self):
+        """Requests without a valid access token are unauthorized"""
+        client = conjur.ApiClient(conjur.Configuration(host=self.mock.url))
+        client.configuration.api_key = {'Authorization': 'Token token="forged"'}
+        with self.assertRaises(conjur.ApiException) as context:
+            conjur.SecretsApi(client).get_secret(self.mock.account, 'variable', 'db/password')
+        client.close()
+        self.assertEqual(context.exception.status, 401)
+
+    def test_injected_errors(self):
+        """A fault on one operation fails it with the configured status"""
+        self.mock.set_fault('getSecret', error_rate=1, error_status=502, retry_after=1)
+        with self.assertRaises(conjur.ApiException) as context:
+            conjur.SecretsApi(self.client).get_secret(self.mock.account, 'variable',
+                                                      'db/password')
+        self.assertEqual(context.exception.status, 502)
+        self.assertEqual(context.exception.headers['Retry-After'], '1')
+
+    def test_rate_limit(self):
+        """Requests over the rate limit get a 429 with a Retry-After"""
+        self.mock.add_secret('db/password', 'secret')
+        self.mock.set_fault(rate_limit=1, burst=2)
+        api = conjur.SecretsApi(self.client)
+        api.get_secret(self.mock.account, 'variable', 'db/password')
+        api.get_secret(self.mock.account, 'variable', 'db/password')
+        with self.assertRaises(conjur.ApiException) as context:
+            api.get_secret(self.mock.account, 'variable', 'db/password')
+        self.assertEqual(context.exception.status, 429)
+        self.assertEqual(context.exception.headers['Retry-After'], '1')
+
+    def test_latency(self):
+        """Configured latency is added to every response"""
+        self.mock.set_fault(latency=0.05)
+        start = time.monotonic()
+        conjur.StatusApi(self.client).health()
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
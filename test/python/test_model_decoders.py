@@ -0,0 +1,112 @@
+from __future__ import absolute_import
+
+import json
+import unittest
+from collections import namedtuple
+
+import conjur
+
+Response = namedtuple('Response', 'data')
+
+ANNOTATION = {'name': 'description', 'value': 'Database', 'policy': 'dev:policy:root'}
+RESOURCE = {'id': 'dev:variable:db/password', 'annotations': [ANNOTATION]}
+
+
+class Annotated(object):
+    """A model with a discriminator, shaped like those the generator emits. The spec has
+    none, so its child models are the generated PolicyAnnotation and PolicyVersion"""
+    openapi_types = {'name': 'str'}
+    attribute_map = {'name': 'name'}
+    discriminator_value_class_map = {
+        'description': 'PolicyAnnotation',
+        'version': 'PolicyVersion',
+    }
+
+    def __init__(self, name=None, local_vars_configuration=None):
+        self.name = name
+        self.discriminator = 'name'
+
+    def get_real_child_model(self, data):
+        discriminator_key = self.attribute_map[self.discriminator]
+        discriminator_value = data[discriminator_key]
+        return self.discriminator_value_class_map.get(discriminator_value)
+
+
+class TestModelDecoders(unittest.TestCase):
+    """Tests for the decode functions ApiClient builds for each response type. These tests
+    need no Conjur deployment"""
+    def setUp(self):
+        self.client = conjur.ApiClient(conjur.Configuration(host='http://localhost'))
+
+    def tearDown(self):
+        self.client.close()
+
+    def read(self, data, response_type):
+        return self.client.deserialize(Response(json.dumps(data).encode('utf-8')),
+                                       response_type)
+
+    def test_decoder_reused(self):
+        """The decoder of a type is built once"""
+        self.read([RESOURCE], 'list[Resource]')
+        decoder = self.client._decoders['list[Resource]']
+
+        self.read([RESOURCE], 'list[Resource]')
+
+        self.assertIs(self.client._decoders['list[Resource]'], decoder)
+        self.assertIn('Resource', self.client._decoders)
+
+    def test_nested_models(self):
+        """Models nested in lists and models are decoded to their classes"""
+        resources = self.read([RESOURCE], 'list[Resource]')
+
+        self.assertIsInstance(resources[0], conjur.models.Resource)
+        self.assertIsInstance(resources[0].annotations[0], conjur.models.PolicyAnnotation)
+        self.assertEqual(resources[0].annotations[0].value, 'Database')
+
+    def test_none_items(self):
+        """None in lists and dicts is kept, not decoded"""
+        self.assertEqual(self.read([None, RESOURCE], 'list[Resource]')[0], None)
+        self.assertEqual(self.read([1, None], 'list[int]'), [1, None])
+        self.assertEqual(self.read({'a': None}, 'dict(str, Resource)'), {'a': None})
+
+    def test_dict_values(self):
+        """Values of dict(str, X) types are decoded, their keys are kept"""
+        resources = self.read({'db': RESOURCE}, 'dict(str, Resource)')
+        self.assertEqual(list(resources), ['db'])
+        self.assertIsInstance(resources['db'], conjur.models.Resource)
+        self.assertEqual(resources['db'].id, RESOURCE['id'])
+
+        versions = self.read({'a': [1, 2]}, 'dict(str, list[int])')
+        self.assertEqual(versions, {'a': [1, 2]})
+
+    def test_primitives(self):
+        """JSON values of the schema's type are returned as they are, others are
+        converted as the stock deserializer does, bool and int included"""
+        self.assertIs(self.read(True, 'bool'), True)
+        self.assertIs(self.read(7, 'int'), 7)
+
+        for data, response_type, expected in ((True, 'int', 1),
+                                              (1, 'bool', True),
+                                              (2, 'float', 2.0),
+                                              (5, 'str', '5')):
+            value = self.read(data, response_type)
+            self.assertEqual(value, expected)
+            self.assertIs(type(value), type(expected))
+
+    def test_discriminator(self):
+        """Models with a discriminator decode to the child model it names, or to
+        themselves when it names none"""
+        annotation = self.read(ANNOTATION, Annotated)
+        self.assertIsInstance(annotation, conjur.models.PolicyAnnotation)
+        self.assertEqual(annotation.policy, 'dev:policy:root')
+
+        version = self.read({'name': 'version', 'version': 2}, Annotated)
+        self.assertIsInstance(version, conjur.models.PolicyVersion)
+        self.assertEqual(version.version, 2)
+
+        other = self.read({'name': 'other'}, Annotated)
+        self.assertIsInstance(other, Annotated)
+        self.assertEqual(other.name, 'other')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+from __future__ import absolute_import
+
+import unittest
+from unittest.mock import patch
+
+import conjur
+
+from . import api_config
+
+
+class TestPaginator(api_config.ConfiguredTest):
+    """Paginator integration tests"""
+    def setUp(self):
+        self.resources_api = conjur.api.ResourcesApi(self.client)
+        self.roles_api = conjur.api.RolesApi(self.client)
+
+    def test_resources_paginated(self):
+        """Test paging through resources returns the same items as one listing"""
+        expected = [i.id for i in self.resources_api.show_resources_for_account(self.account)]
+        paginator = conjur.Paginator(
+            self.resources_api.show_resources_for_account,
+            self.account,
+            page_size=2
+        )
+
+        with patch.object(self.client.rest_client, 'request',
+                          wraps=self.client.rest_client.request) as mock:
+            resource_ids = [i.id for i in paginator]
+
+        self.assertEqual(resource_ids, expected)
+        self.assertEqual(paginator.total, len(expected))
+        self.assertEqual(paginator.fetched, len(expected))
+        self.assertEqual(paginator.progress, 1.0)
+        # one count request and a page request for every page, including the
+        # final short page
+        self.assertEqual(mock.call_count, 1 + len(expected) // 2 + 1)
+
+    def test_resources_for_kind_paginated(self):
+        """Test listing options are passed along with every page request"""
+        paginator = conjur.Paginator(
+            self.resources_api.show_resources_for_kind,
+            self.account,
+            'variable',
+            search='password',
+            page_size=1
+        )
+
+        resource_ids = [i.id for i in paginator]
+
+        self.assertEqual(resource_ids, [f"{self.account}:variable:one/password"])
+        self.assertEqual(paginator.total, 1)
+
+    def test_prefetch(self):
+        """Test pages are requested ahead on the client's thread pool"""
+        expected = [i.id for i in self.resources_api.show_resources_for_account(self.account)]
+        paginator = conjur.Paginator(
+            self.resources_api.show_resources_for_account,
+            self.account,
+            page_size=3,
+            prefetch=True,
+            count=False
+        )
+
+        pages = paginator.pages()
+        first_page = next(pages)
+        remaining = [i.id for page in pages for i in page]
+
+        self.assertIsNone(paginator.total)
+        self.assertIsNone(paginator.progress)
+        self.assertEqual([i.id for i in first_page] + remaining, expected)
+
+    def test_role_memberships_paginated(self):
+        """Test paging through the memberships of a role"""
+        expected = self.roles_api.show_role(self.account, 'user', 'alice', memberships='')
+        paginator = conjur.Paginator(
+            self.roles_api.show_role,
+            self.account,
+            'user',
+            'alice',
+            memberships='',
+            page_size=1
+        )
+
+        self.assertEqual(list(paginator), expected)
+        self.assertEqual(paginator.total, len(expected))
+
+    def test_offset_rejected(self):
+        """Test paging parameters can not be passed to the listing method"""
+        with self.assertRaises(conjur.exceptions.ApiValueError):
+            conjur.Paginator(
+                self.resources_api.show_resources_for_account,
+                self.account,
+                offset=5
+            )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+
+import time
+import unittest
+from multiprocessing.pool import ThreadPool
+
+import conjur
+import urllib3
+
+from . import api_config
+
+TEST_VARIABLE = "one/password"
+
+
+class TestPoolRegistry(api_config.ConfiguredTest):
+    """PoolRegistry integration tests"""
+    def setUp(self):
+        self.registry = conjur.PoolRegistry(
+            max_connections=4,
+            max_connections_per_host=2,
+            idle_timeout=0.5,
+            lease_timeout=0.5
+        )
+        self.addCleanup(self.registry.clear)
+        conjur.api.SecretsApi(self.client).create_secret(
+            self.account,
+            "variable",
+            TEST_VARIABLE,
+            body="pooled"
+        )
+
+    def new_client(self):
+        """Creates an authenticated client using the test registry"""
+        config = api_config.get_api_config()
+        config.pool_registry = self.registry
+        config.api_key = self.client.configuration.api_key
+        return conjur.ApiClient(config)
+
+    def get_secret(self, client):
+        """Reads the test variable with a client"""
+        return conjur.api.SecretsApi(client).get_secret(self.account, "variable", TEST_VARIABLE)
+
+    def test_clients_share_connections(self):
+        """Test clients with the same settings reuse each other's connections"""
+        clients = [self.new_client() for _ in range(5)]
+
+        for client in clients:
+            self.assertEqual(self.get_secret(client), "pooled")
+
+        self.assertIs(clients[0].rest_client.pool_manager, clients[-1].rest_client.pool_manager)
+        stats = self.registry.stats()
+        self.assertEqual(stats['pool_managers'], 1)
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['idle_connections'], 1)
+
+    def test_per_host_cap(self):
+        """Test concurrent requests never open more connections than the per host cap"""
+        clients = [self.new_client() for _ in range(8)]
+
+        with ThreadPool(8) as pool:
+            results = pool.map(self.get_secret, clients * 3)
+
+        self.assertEqual(results, ["pooled"] * 24)
+        self.assertLessEqual(self.registry.stats()['connections_created'], 2)
+        self.assertEqual(self.registry.stats()['leased_connections'], 0)
+
+    def test_max_connections(self):
+        """Test requests wait for a connection once max_connections are in use"""
+        registry = conjur.PoolRegistry(max_connections=1, lease_timeout=0.1)
+        self.addCleanup(registry.clear)
+        self.registry = registry
+        client = self.new_client()
+        api = conjur.api.SecretsApi(client)
+        streamed = api.get_secret(self.account, "variable", TEST_VARIABLE, _preload_content=False)
+
+        with self.assertRaises(urllib3.exceptions.EmptyPoolError):
+            self.get_secret(client)
+
+        self.assertEqual(streamed.read(), b"pooled")
+        streamed.release_conn()
+        self.assertEqual(self.get_secret(client), "pooled")
+
+    def test_idle_pools_evicted(self):
+        """Test pools left idle for idle_timeout are closed"""
+        self.get_secret(self.new_client())
+        self.assertEqual(self.registry.evict_idle(force=True), 0)
+
+        time.sleep(0.6)
+
+        self.assertEqual(self.registry.evict_idle(), 1)
+        self.assertEqual(self.registry.stats()['idle_connections'], 0)
+        self.assertEqual(self.get_secret(self.new_client()), "pooled")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import conjur
+
+from . import api_config
+
+TEST_VARIABLES = ["one/password", "testSecret"]
+TEST_VARIABLE = TEST_VARIABLES[0]
+THREADS = 8
+
+
+class TestRequestCoalescing(api_config.ConfiguredTest):
+    """Request coalescing integration tests. Ensures identical GET calls made
+    concurrently share a single request to Conjur and its deserialized result"""
+    def setUp(self):
+        config = api_config.get_api_config()
+        config.coalesce_requests = True
+        config.api_key = self.client.configuration.api_key
+        self.coalescing_client = conjur.ApiClient(config)
+        self.api = conjur.api.SecretsApi(self.coalescing_client)
+        for variable in TEST_VARIABLES:
+            self.api.create_secret(self.account, "variable", variable, body="coalesced")
+
+    def tearDown(self):
+        self.coalescing_client.close()
+
+    def run_concurrently(self, target):
+        """Calls target from several threads at once, passing it the index of the
+        thread. Returns the results or exceptions of each call"""
+        barrier = threading.Barrier(THREADS)
+        results = [None] * THREADS
+
+        def run(index):
+            barrier.wait()
+            try:
+                results[index] = target(index)
+            except Exception as e: # pylint: disable=broad-except
+                results[index] = e
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def slow_requests(self):
+        """Patches the connection pool so requests stay in flight long enough for
+        every thread to join them"""
+        pool_manager = self.coalescing_client.rest_client.pool_manager
+        send = pool_manager.request
+
+        def slow_request(*args, **kwargs):
+            time.sleep(0.2)
+            return send(*args, **kwargs)
+
+        return patch.object(pool_manager, 'request', side_effect=slow_request)
+
+    def test_identical_requests_coalesced(self):
+        """Test concurrent get_secret calls are sent as one request"""
+        with self.slow_requests() as mock:
+            results = self.run_concurrently(
+                lambda _: self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+            )
+
+        self.assertEqual(results, ["coalesced"] * THREADS)
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(self.coalescing_client.coalesced_count, THREADS - 1)
+        # the response is deserialized once and its result shared
+        for result in results:
+            self.assertIs(result, results[0])
+
+    def test_different_requests_not_coalesced(self):
+        """Test requests for different resources are all sent"""
+        with self.slow_requests() as mock:
+            results = self.run_concurrently(
+                lambda index: self.api.get_secret(
+                    self.account, "variable", TEST_VARIABLES[index % 2]
+                )
+            )
+
+        self.assertEqual(results, ["coalesced"] * THREADS)
+        self.assertEqual(mock.call_count, 2)
+
+    def test_errors_shared(self):
+        """Test every coalesced caller receives the error response"""
+        with self.slow_requests() as mock:
+            results = self.run_concurrently(
+                lambda _: self.api.get_secret(self.account, "variable", "badname")
+            )
+
+        self.assertEqual(mock.call_count, 1)
+        for result in results:
+            self.assertIsInstance(result, conjur.exceptions.ApiException)
+            self.assertEqual(result.status, 404)
+
+    def test_writes_not_coalesced(self):
+        """Test only GET requests are coalesced"""
+        with self.slow_requests() as mock:
+            self.run_concurrently(
+                lambda _: self.api.create_secret(
+                    self.account, "variable", TEST_VARIABLE, body="coalesced"
+                )
+            )
+
+        self.assertEqual(mock.call_count, THREADS)
+
+if __name__ == '__main__':
+    unittest.main()
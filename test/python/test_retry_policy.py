@@ -0,0 +1,113 @@
+from __future__ import absolute_import
+
+import unittest
+from unittest.mock import patch
+
+import conjur
+import urllib3
+
+from . import api_config
+
+TEST_VARIABLE = "one/password"
+
+
+class TestRetryPolicy(api_config.ConfiguredTest):
+    """RetryPolicy integration tests. Failed responses are injected in front of the
+    connection pool, so the retried requests reach Conjur"""
+    def setUp(self):
+        self.policy = conjur.RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.05)
+        config = api_config.get_api_config()
+        config.retry_policy = self.policy
+        config.api_key = self.client.configuration.api_key
+        self.retry_client = conjur.ApiClient(config)
+        self.api = conjur.api.SecretsApi(self.retry_client)
+        conjur.api.SecretsApi(self.client).create_secret(
+            self.account, "variable", TEST_VARIABLE, body="retried")
+
+    def fail_requests(self, count, status=503, headers=None):
+        """Answers the first `count` requests with `status` instead of sending them"""
+        pool_manager = self.retry_client.rest_client.pool_manager
+        send = pool_manager.request
+        failures = iter(range(count))
+
+        def request(*args, **kwargs):
+            if next(failures, None) is not None:
+                return urllib3.HTTPResponse(body=b'unavailable', status=status, headers=headers or {})
+            return send(*args, **kwargs)
+
+        return patch.object(pool_manager, 'request', side_effect=request)
+
+    def test_get_retried(self):
+        """Test reads failing with 503 are retried"""
+        with self.fail_requests(2) as mock:
+            response = self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        self.assertEqual(response, "retried")
+        self.assertEqual(mock.call_count, 3)
+        self.assertEqual(self.policy.stats()['attempts'], {3: 1})
+
+    def test_attempts_exhausted(self):
+        """Test the last error is raised once max_attempts is reached"""
+        with self.fail_requests(5) as mock:
+            with self.assertRaises(conjur.exceptions.ApiException) as context:
+                self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        self.assertEqual(context.exception.status, 503)
+        self.assertEqual(context.exception.attempts, 3)
+        self.assertEqual(mock.call_count, 3)
+
+    def test_write_not_retried(self):
+        """Test create_secret is not retried unless POST is a retry method"""
+        with self.fail_requests(1) as mock:
+            with self.assertRaises(conjur.exceptions.ApiException) as context:
+                self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="retried")
+
+        self.assertEqual(context.exception.attempts, 1)
+        self.assertEqual(mock.call_count, 1)
+
+        self.policy.retry_methods += ('POST',)
+        with self.fail_requests(1) as mock:
+            self.api.create_secret(self.account, "variable", TEST_VARIABLE, body="retried")
+
+        self.assertEqual(mock.call_count, 2)
+
+    def test_client_errors_not_retried(self):
+        """Test errors other than the retry statuses are raised straight away"""
+        with patch.object(self.retry_client.rest_client.pool_manager, 'request',
+                          wraps=self.retry_client.rest_client.pool_manager.request) as mock:
+            with self.assertRaises(conjur.exceptions.ApiException) as context:
+                self.api.get_secret(self.account, "variable", "badname")
+
+        self.assertEqual(context.exception.status, 404)
+        self.assertEqual(mock.call_count, 1)
+
+    def test_retry_after(self):
+        """Test Retry-After sets the delay, and long waits fail straight away"""
+        with self.fail_requests(1, status=429, headers={'Retry-After': '0.2'}):
+            with patch('time.sleep') as sleep:
+                self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        self.assertGreaterEqual(sleep.call_args[0][0], 0.2)
+
+        with self.fail_requests(1, status=503, headers={'Retry-After': '3600'}):
+            with self.assertRaises(conjur.exceptions.ApiException) as context:
+                self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        self.assertEqual(context.exception.attempts, 1)
+
+    def test_retry_budget(self):
+        """Test retries stop once the host's retry budget is spent"""
+        self.policy.budget_burst = 2
+        self.policy.budget_per_second = 0
+
+        with self.fail_requests(10):
+            for _ in range(3):
+                with self.assertRaises(conjur.exceptions.ApiException):
+                    self.api.get_secret(self.account, "variable", TEST_VARIABLE)
+
+        stats = self.policy.stats()
+        self.assertEqual(stats['retries'], 2)
+        self.assertGreater(stats['budget_exhausted'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
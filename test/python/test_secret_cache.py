@@ -0,0 +1,126 @@
+from __future__ import absolute_import
+
+import time
+import unittest
+from unittest.mock import patch
+
+import conjur
+
+from . import api_config
+
+TEST_VARIABLES = ["one/password", "testSecret"]
+
+
+class TestSecretCache(api_config.ConfiguredTest):
+    """SecretCache integration tests. Ensures secret values are served from the client
+    side cache and invalidated by writes made through the same client"""
+    def setUp(self):
+        self.cache = conjur.SecretCache(max_entries=8, ttl=60)
+        self.cached_client = conjur.ApiClient(
+            api_config.get_api_config(),
+            secret_cache=self.cache
+        )
+        self.cached_client.configuration.api_key = self.client.configuration.api_key
+        self.api = conjur.api.SecretsApi(self.cached_client)
+        for secret in TEST_VARIABLES:
+            self.api.create_secret(self.account, "variable", secret, body=f"{secret} value")
+
+    def tearDown(self):
+        self.cached_client.close()
+
+    def count_requests(self):
+        """Patches the REST client so requests reaching the server can be counted"""
+        rest_client = self.cached_client.rest_client
+        return patch.object(rest_client, 'request', wraps=rest_client.request)
+
+    def test_get_secret_cached(self):
+        """Test repeated get_secret calls only request the value once"""
+        with self.count_requests() as mock:
+            first = self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+            second = self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+
+        self.assertEqual(first, "one/password value")
+        self.assertEqual(first, second)
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_create_secret_invalidates(self):
+        """Test create_secret drops the cached value of its variable"""
+        self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+        self.api.create_secret(self.account, "variable", TEST_VARIABLES[0], body="new value")
+
+        secret = self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+
+        self.assertEqual(secret, "new value")
+
+    def test_value_read_before_write_not_cached(self):
+        """Test a value which was requested before its variable was written, and answered
+        after, is not cached"""
+        rest_client = self.cached_client.rest_client
+        send = rest_client.request
+
+        def request(*args, **kwargs):
+            response = send(*args, **kwargs)
+            if args[0] == 'GET' and mock.call_count == 1:
+                self.api.create_secret(self.account, "variable", TEST_VARIABLES[0],
+                                       body="new value")
+            return response
+
+        with patch.object(rest_client, 'request', side_effect=request) as mock:
+            stale = self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+            secret = self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+
+        self.assertEqual(stale, "one/password value")
+        self.assertEqual(secret, "new value")
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_policy_load_clears_cache(self):
+        """Test loading a policy through the cached client clears the cache"""
+        self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+        self.assertEqual(len(self.cache), 1)
+
+        conjur.api.PoliciesApi(self.cached_client).update_policy(
+            self.account,
+            'root',
+            api_config.get_default_policy()
+        )
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_get_secrets_requests_missing_values(self):
+        """Test get_secrets only requests values which are not already cached"""
+        secret_ids = [f"{self.account}:variable:{i}" for i in TEST_VARIABLES]
+        self.api.get_secrets(secret_ids[0])
+
+        with self.count_requests() as mock:
+            response = self.api.get_secrets(",".join(secret_ids))
+
+        self.assertEqual(response[secret_ids[0]], "one/password value")
+        self.assertEqual(response[secret_ids[1]], "testSecret value")
+        _, kwargs = mock.call_args
+        self.assertEqual(kwargs['query_params'], [('variable_ids', secret_ids[1])])
+
+    def test_expired_value_requested_again(self):
+        """Test values are requested again once their ttl has passed"""
+        secret_id = f"{self.account}:variable:{TEST_VARIABLES[0]}"
+        self.cache.ttls[secret_id] = 0.1
+        self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+        time.sleep(0.2)
+
+        with self.count_requests() as mock:
+            self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+
+        self.assertEqual(mock.call_count, 1)
+
+    def test_evicted_value_zeroed(self):
+        """Test values are overwritten with zeros when they leave the cache"""
+        self.api.get_secret(self.account, "variable", TEST_VARIABLES[0])
+        # pylint: disable=protected-access
+        value, _ = next(iter(self.cache._entries.values()))
+
+        self.cache.clear()
+
+        self.assertEqual(value, bytearray(len(value)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from __future__ import absolute_import
+
+import types
+import unittest
+
+import conjur
+
+from . import api_config
+
+
+class TestStreamingDeserialization(api_config.ConfiguredTest):
+    """ApiClient.iter_deserialize integration tests"""
+    def setUp(self):
+        self.resources_api = conjur.api.ResourcesApi(self.client)
+        self.roles_api = conjur.api.RolesApi(self.client)
+
+    def test_resources_streamed(self):
+        """Test a resource listing is deserialized into Resource models one at a time"""
+        expected = self.resources_api.show_resources_for_account(self.account)
+        response = self.resources_api.show_resources_for_account(
+            self.account,
+            _preload_content=False
+        )
+
+        resources = self.client.iter_deserialize(response, 'list[Resource]', chunk_size=16)
+
+        self.assertIsInstance(resources, types.GeneratorType)
+        self.assertEqual(list(resources), expected)
+
+    def test_role_memberships_streamed(self):
+        """Test items of untyped responses are yielded as decoded"""
+        expected = self.roles_api.show_role(self.account, 'user', 'alice', memberships='')
+        response = self.roles_api.show_role(
+            self.account,
+            'user',
+            'alice',
+            memberships='',
+            _preload_content=False
+        )
+
+        memberships = list(self.client.iter_deserialize(response, 'object', chunk_size=7))
+
+        self.assertEqual(memberships, expected)
+
+    def test_not_an_array(self):
+        """Test responses which are not JSON arrays are rejected"""
+        response = self.roles_api.show_role(
+            self.account,
+            'user',
+            'alice',
+            _preload_content=False
+        )
+
+        with self.assertRaises(conjur.exceptions.ApiValueError):
+            list(self.client.iter_deserialize(response, 'object'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from __future__ import absolute_import
+
+import unittest
+
+import conjur
+
+from . import api_config
+
+
+class TestTlsSessions(api_config.ConfiguredTest):
+    """Tests TLS contexts and sessions are shared between clients with the same
+    TLS settings"""
+    def new_client(self, transport='urllib3'):
+        """Creates an authenticated client which does not share connections with
+        any other"""
+        config = api_config.get_api_config()
+        config.transport = transport
+        config.api_key = self.client.configuration.api_key
+        client = conjur.ApiClient(config)
+        self.addCleanup(client.rest_client.pool_manager.clear)
+        return client
+
+    def open_connection(self, client):
+        """Makes a request which opens a new TLS connection"""
+        conjur.api.SecretsApi(client).get_secret(self.account, "variable", "one/password")
+        client.rest_client.pool_manager.clear()
+
+    def setUp(self):
+        conjur.api.SecretsApi(self.client).create_secret(
+            self.account,
+            "variable",
+            "one/password",
+            body="secret"
+        )
+
+    def test_context_shared(self):
+        """Test clients with the same TLS settings share an SSL context"""
+        first = self.new_client()
+        second = self.new_client()
+        config = api_config.get_api_config()
+        config.verify_ssl = False
+        other = conjur.ApiClient(config)
+
+        self.assertIs(first.rest_client.ssl_context, second.rest_client.ssl_context)
+        self.assertIsNot(first.rest_client.ssl_context, other.rest_client.ssl_context)
+
+    def test_session_resumed(self):
+        """Test a new client resumes the TLS session of an earlier one"""
+        self.open_connection(self.new_client())
+        client = self.new_client()
+        before = client.rest_client.tls_metrics()
+
+        self.open_connection(client)
+        after = client.rest_client.tls_metrics()
+
+        self.assertEqual(after['handshakes'], before['handshakes'] + 1)
+        self.assertEqual(after['resumed_handshakes'], before['resumed_handshakes'] + 1)
+        self.assertGreater(after['handshake_seconds'], before['handshake_seconds'])
+
+    def test_http2_session_resumed(self):
+        """Test the http2 transport resumes TLS sessions"""
+        self.open_connection(self.new_client('http2'))
+        client = self.new_client('http2')
+        before = client.rest_client.tls_metrics()
+
+        self.open_connection(client)
+        after = client.rest_client.tls_metrics()
+
+        self.assertEqual(after['resumed_handshakes'], before['resumed_handshakes'] + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+from __future__ import absolute_import
+
+import unittest
+from unittest.mock import patch
+
+import conjur
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+
+from . import api_config
+
+TEST_VARIABLE = "one/password"
+
+
+class RecordingTracer(conjur.Tracer):
+    """Tracer keeping the hooks it was called with"""
+    def __init__(self):
+        self.calls = []
+
+    def start_call(self, operation, attributes):
+        self.calls.append(('start_call', operation, attributes))
+        return operation
+
+    def end_call(self, span, status, error=None):
+        self.calls.append(('end_call', span, status, type(error).__name__ if error else None))
+
+    def start_request(self, method, url, headers):
+        headers['X-Test-Trace'] = 'traced'
+        self.calls.append(('start_request', method))
+        return method
+
+    def end_request(self, span, status, error=None):
+        self.calls.append(('end_request', span, status))
+
+
+class TestTracing(api_config.ConfiguredTest):
+    """Tracer integration tests"""
+    def traced_api(self, tracer):
+        config = api_config.get_api_config()
+        config.tracer = tracer
+        config.api_key = self.client.configuration.api_key
+        self.traced_client = conjur.ApiClient(config)
+        return conjur.api.SecretsApi(self.traced_client)
+
+    def sent_headers(self):
+        pool_manager = self.traced_client.rest_client.pool_manager
+        return patch.object(pool_manager, 'request', wraps=pool_manager.request)
+
+    def test_hooks(self):
+        """Test the call and request hooks are called in order, and request
+        hooks may add headers"""
+        tracer = RecordingTracer()
+        api = self.traced_api(tracer)
+        api.create_secret(self.account, "variable", TEST_VARIABLE, body="traced")
+        with self.sent_headers() as mock:
+            api.get_secret(self.account, "variable", TEST_VARIABLE)
+        with self.assertRaises(conjur.ApiException):
+            api.get_secret(self.account, "variable", "badname")
+
+        self.assertEqual(mock.call_args[1]['headers']['X-Test-Trace'], 'traced')
+        attributes = {
+            'conjur.operation_id': 'getSecret',
+            'conjur.account': self.account,
+            'conjur.kind': 'variable',
+            'http.request.method': 'GET',
+        }
+        self.assertEqual(tracer.calls[4:], [
+            ('start_call', 'getSecret', attributes),
+            ('start_request', 'GET'),
+            ('end_request', 'GET', 200),
+            ('end_call', 'getSecret', 200, None),
+            ('start_call', 'getSecret', attributes),
+            ('start_request', 'GET'),
+            ('end_request', 'GET', 404),
+            ('end_call', 'getSecret', 404, 'ApiException'),
+        ])
+
+    def test_opentelemetry_spans(self):
+        """Test OpenTelemetryTracer reports calls as spans and sends their
+        context to Conjur"""
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        api = self.traced_api(conjur.OpenTelemetryTracer(provider.get_tracer(__name__)))
+
+        api.create_secret(self.account, "variable", TEST_VARIABLE, body="secret-value")
+        with self.sent_headers() as mock:
+            api.get_secret(self.account, "variable", TEST_VARIABLE)
+        with self.assertRaises(conjur.ApiException):
+            api.get_secret(self.account, "variable", "badname")
+
+        created, read, missing = exporter.get_finished_spans()
+        self.assertEqual(created.name, 'createSecret')
+        self.assertEqual(read.attributes['http.response.status_code'], 200)
+        self.assertEqual(read.attributes['conjur.kind'], 'variable')
+        self.assertEqual(missing.status.status_code, StatusCode.ERROR)
+        self.assertNotIn('secret-value', str(dict(created.attributes)))
+
+        headers = mock.call_args[1]['headers']
+        trace_id = format(read.context.trace_id, '032x')
+        self.assertIn(trace_id, headers['traceparent'])
+        self.assertEqual(headers['X-Request-Id'], trace_id)
+
+    def test_request_id_kept(self):
+        """Test an X-Request-Id set by the caller is sent unchanged"""
+        api = self.traced_api(conjur.OpenTelemetryTracer(TracerProvider().get_tracer(__name__)))
+        api.create_secret(self.account, "variable", TEST_VARIABLE, body="traced")
+        with self.sent_headers() as mock:
+            api.get_secret(self.account, "variable", TEST_VARIABLE, x_request_id="test-id")
+
+        self.assertEqual(mock.call_args[1]['headers']['X-Request-Id'], 'test-id')
+
+if __name__ == '__main__':
+    unittest.main()